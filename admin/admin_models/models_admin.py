@@ -29,6 +29,8 @@ class OrganizationAdmin(ModelView, model=Organization):
 
 class EventAdmin(ModelView, model=Event):
     column_list = [Event.id, Event.address, Event.worker]
+    # Геометрия хранится в бинарном виде и заполняется импортом, bbox считается из нее
+    form_excluded_columns = [Event.geom, Event.min_lat, Event.min_lon, Event.max_lat, Event.max_lon]
 
 
 class EventCategoryAdmin(ModelView, model=EventCategory):
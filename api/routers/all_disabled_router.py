@@ -7,6 +7,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.database import get_async_session
 from api.services.external.warning_service import WarningService
+from api.services.external.weather_prefetcher import weather_prefetcher
+from api.services.internal.route_service import RouteService
+from api.schemas.all_disabled_schemes import WarningBatchScheme, WarningPointScheme
 
 
 router = APIRouter(prefix='/disabled',
@@ -33,4 +36,65 @@ async def get_warnings(latitude: str = Query(description='Широта'),
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail='Unexpected error while getting warnings'
-        )
\ No newline at end of file
+        )
+
+
+@router.post('/warnings/batch', response_model=List[WarningPointScheme])
+async def get_warnings_batch(batch: WarningBatchScheme,
+                             session: AsyncSession = Depends(get_async_session)):
+    """Роут для получения погодных предупреждений сразу для всех точек маршрута.
+
+    Args:
+        batch (WarningBatchScheme): список точек или идентификатор маршрута
+        session (AsyncSession): асинхронная сессия
+
+    Returns:
+        List[WarningPointScheme]: предупреждения для каждой точки в порядке запроса
+    """
+
+    try:
+        if (batch.points is None) == (batch.route_id is None):
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail='Either points or route_id must be passed'
+            )
+
+        if batch.route_id is not None:
+            route_dict = await RouteService(session=session).get_route(entity_id=batch.route_id)
+
+            if not route_dict:
+                raise HTTPException(
+                    status_code=HTTPStatus.NOT_FOUND,
+                    detail='Route not found'
+                )
+
+            points = [(point['latitude'], point['longitude']) for point in route_dict['points']]
+
+        else:
+            points = [(point.latitude, point.longitude) for point in batch.points]
+
+        points_warnings = await WarningService().get_weather_warnings_batch(points=points)
+
+        return [WarningPointScheme(latitude=lat, longitude=lon, warnings=warnings)
+                for (lat, lon), warnings in zip(points, points_warnings)]
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        logger.exception('Unexpected error in get_warnings_batch: %s', e)
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail='Unexpected error while getting warnings'
+        )
+
+
+@router.get('/warnings/metrics', response_model=dict)
+async def get_warnings_metrics():
+    """Роут для получения метрик кеша погоды и фонового обновления тайлов.
+
+    Returns:
+        dict: hit rate кешей, число обновлений и задержка обновления относительно плана
+    """
+
+    return weather_prefetcher.metrics()
@@ -1,12 +1,18 @@
-import base64
+import json
 import logging
 
 from http import HTTPStatus
-from fastapi import APIRouter, HTTPException, File, UploadFile, Depends
+from typing import Union
+
+from fastapi import APIRouter, HTTPException, File, UploadFile, Depends, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.database import get_async_session
-from api.services.internal.blind_service import BlindHelpService
+from api.services.external.llm_service import llm_metrics
+from api.schemas.blind_schemes import BlindJobScheme
+from api.services.internal.blind_service import BlindHelpService, description_cache, description_jobs
+from api.services.internal.job_queue import QueueFullError
 
 
 router = APIRouter(prefix='/blinds',
@@ -15,15 +21,20 @@ router = APIRouter(prefix='/blinds',
 logger = logging.getLogger(__name__)
 
 
-@router.post('/summary/create', response_model=str)
+@router.post('/summary/create', response_model=Union[str, BlindJobScheme])
 async def create_image_summary(description: str = None,
                                    image: UploadFile = File(...),
+                                   async_mode: bool = Query(False, description='Вернуть id задачи, не дожидаясь ответа'),
                                    session: AsyncSession = Depends(get_async_session)):
     """Роут для создания контакта клиента.
 
+    В режиме async_mode сразу отвечает 202 с задачей, результат забирается через /blinds/jobs/{id}.
+    Если очередь задач заполнена, отвечает 429.
+
     Args:
         image (UploadFile): изображение от пользователя
         description: (str): описание изображения от пользователя
+        async_mode (bool): поставить запрос в очередь и вернуть id задачи
         session (AsyncSession): асинхронная сессия
 
     Returns:
@@ -32,9 +43,21 @@ async def create_image_summary(description: str = None,
 
     try:
         contents = await image.read()
-        base64_encoded = base64.b64encode(contents).decode('utf-8')
 
-        image_description = await BlindHelpService(session=session).create_description(image=base64_encoded,
+        if async_mode:
+            try:
+                job = await BlindHelpService(session=session).submit_description(image=contents,
+                                                                                 description=description)
+            except QueueFullError:
+                raise HTTPException(
+                    status_code=HTTPStatus.TOO_MANY_REQUESTS,
+                    detail='Too many image descriptions in progress, try again later',
+                    headers={'Retry-After': '5'}
+                )
+
+            return JSONResponse(status_code=HTTPStatus.ACCEPTED, content=BlindJobScheme(**job).dict())
+
+        image_description = await BlindHelpService(session=session).create_description(image=contents,
                                                                                        description=description)
 
         return image_description
@@ -50,6 +73,53 @@ async def create_image_summary(description: str = None,
         )
 
 
+@router.post('/summary/stream')
+async def stream_image_summary(description: str = None,
+                               image: UploadFile = File(...),
+                               session: AsyncSession = Depends(get_async_session)):
+    """Роут для создания тифлокомментария с отдачей текста по мере генерации (Server-Sent Events).
+
+    Каждое событие содержит JSON {"text": "..."} с очередным фрагментом. Поток завершается
+    событием done, при ошибке OpenRouter - событием error.
+
+    Args:
+        image (UploadFile): изображение от пользователя
+        description: (str): описание изображения от пользователя
+        session (AsyncSession): асинхронная сессия
+
+    Returns:
+        StreamingResponse: поток text/event-stream
+    """
+
+    try:
+        contents = await image.read()
+        chunks = BlindHelpService(session=session).stream_description(image=contents, description=description)
+
+        async def events():
+            try:
+                async for chunk in chunks:
+                    yield f'data: {json.dumps({"text": chunk}, ensure_ascii=False)}\n\n'
+
+                yield 'event: done\ndata: {}\n\n'
+
+            except Exception as e:
+                logger.exception('LLM stream failed in stream_image_summary: %s', e)
+                yield f'event: error\ndata: {json.dumps({"detail": "Error while creating image description"})}\n\n'
+
+        return StreamingResponse(events(), media_type='text/event-stream',
+                                 headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        logger.exception('Unexpected error in stream_image_summary: %s', e)
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail='Unexpected error while creating image description'
+        )
+
+
 @router.post('/map/position/get', response_model=str)
 async def get_map_mark_location(image: UploadFile = File(...),
                                 session: AsyncSession = Depends(get_async_session)):
@@ -65,9 +135,8 @@ async def get_map_mark_location(image: UploadFile = File(...),
 
     try:
         contents = await image.read()
-        base64_encoded = base64.b64encode(contents).decode('utf-8')
 
-        image_description = await BlindHelpService(session=session).get_user_map_position(image=base64_encoded)
+        image_description = await BlindHelpService(session=session).get_user_map_position(image=contents)
 
         return image_description
 
@@ -79,4 +148,55 @@ async def get_map_mark_location(image: UploadFile = File(...),
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail='Unexpected error while getting mark location'
-        )
\ No newline at end of file
+        )
+
+
+@router.get('/jobs/{job_id}', response_model=BlindJobScheme)
+async def get_job(job_id: str,
+                  wait: float = Query(0, ge=0, le=30, description='Сколько секунд ждать завершения задачи'),
+                  session: AsyncSession = Depends(get_async_session)):
+    """Роут для получения состояния задачи на тифлокомментарий.
+
+    С wait > 0 отвечает, как только задача завершится, но не позже чем через wait секунд.
+
+    Args:
+        job_id (str): идентификатор задачи
+        wait (float): время ожидания завершения в секундах
+        session (AsyncSession): асинхронная сессия
+
+    Returns:
+        BlindJobScheme: статус задачи и результат
+    """
+
+    try:
+        job = await description_jobs.wait(job_id, timeout=wait) if wait else await description_jobs.get(job_id)
+
+        if job is None:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND,
+                detail='Job not found'
+            )
+
+        return BlindJobScheme(**job)
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        logger.exception('Unexpected error in get_job: %s', e)
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail='Unexpected error while getting job'
+        )
+
+
+@router.get('/metrics', response_model=dict)
+async def get_llm_metrics():
+    """Роут для получения метрик запросов к LLM.
+
+    Returns:
+        dict: время ожидания в очереди, время ответа OpenRouter, время до первого фрагмента потокового
+            ответа, попадания в кеш результатов и очередь задач
+    """
+
+    return {**llm_metrics.as_dict(), 'result_cache': description_cache.stats(), 'jobs': description_jobs.stats()}
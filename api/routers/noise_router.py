@@ -1,13 +1,15 @@
 import logging
 
-from typing import List
+from typing import List, Optional, Tuple
 
 from http import HTTPStatus
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.database import get_async_session
 from api.services.internal.noise_service import NoiseService
+from api.schemas.noise_schemes import NoiseHeatmapScheme, NoiseNearestBatchScheme, NoiseNearestScheme
 
 router = APIRouter(prefix='/noise',
                    tags=['Noise'])
@@ -15,17 +17,198 @@ router = APIRouter(prefix='/noise',
 logger = logging.getLogger(__name__)
 
 
+def _parse_bbox(bbox: str) -> Tuple[float, float, float, float]:
+    """Разбирает bbox вида min_lon,min_lat,max_lon,max_lat"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox.split(','))
+    except ValueError:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='bbox must be min_lon,min_lat,max_lon,max_lat'
+        )
+
+    if min_lon > max_lon or min_lat > max_lat:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='bbox minimum corner must not exceed the maximum corner'
+        )
+
+    return min_lon, min_lat, max_lon, max_lat
+
+
 @router.get('/points', response_model=List[dict])
-async def get_noise_points(count: int = Query(description='Количество точек'),
+async def get_noise_points(count: Optional[int] = Query(None, description='Количество точек'),
+                           bbox: Optional[str] = Query(None, description='Область видимости: '
+                                                                         'min_lon,min_lat,max_lon,max_lat'),
+                           lat: Optional[float] = Query(None, description='Широта центра поиска'),
+                           lon: Optional[float] = Query(None, description='Долгота центра поиска'),
+                           radius: Optional[float] = Query(None, gt=0, description='Радиус поиска в метрах'),
                            session: AsyncSession = Depends(get_async_session)):
+    """Роут для получения шумных точек.
+
+    Без bbox и lat/lon/radius возвращает случайную выборку по всему городу, с ними -
+    только точки внутри области (не больше count, если он передан).
+
+    Args:
+        count (int): количество точек
+        bbox (str): область видимости
+        lat (float): широта центра поиска
+        lon (float): долгота центра поиска
+        radius (float): радиус поиска в метрах
+        session (AsyncSession): асинхронная сессия
+
+    Returns:
+        List[dict]: шумные точки
+    """
+
     try:
+        if count is not None and count < 0:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail='count must not be negative'
+            )
+
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = _parse_bbox(bbox)
+
+            return await NoiseService().get_noise_points_in_bbox(min_lat=min_lat, min_lon=min_lon,
+                                                                 max_lat=max_lat, max_lon=max_lon,
+                                                                 count=count)
+
+        radius_params = (lat, lon, radius)
+
+        if any(param is not None for param in radius_params):
+            if any(param is None for param in radius_params):
+                raise HTTPException(
+                    status_code=HTTPStatus.BAD_REQUEST,
+                    detail='lat, lon and radius must be passed together'
+                )
+
+            return await NoiseService().get_noise_points_in_radius(lat=lat, lon=lon, radius=radius, count=count)
+
+        if count is None:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail='count is required without bbox or lat/lon/radius'
+            )
+
         noise_points = await NoiseService().get_noise_points(count=count)
 
         return noise_points
 
+    except HTTPException:
+        raise
+
     except Exception as e:
         logger.exception('Unexpected error in get_noise_points: %s', e)
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail='Unexpected error while getting noise map points'
         )
+
+
+@router.get('/heatmap', response_model=NoiseHeatmapScheme)
+async def get_noise_heatmap(request: Request,
+                            zoom: int = Query(description='Уровень зума карты'),
+                            bbox: Optional[str] = Query(None, description='Область видимости: '
+                                                                          'min_lon,min_lat,max_lon,max_lat'),
+                            session: AsyncSession = Depends(get_async_session)):
+    """Роут для получения теплокарты шума.
+
+    Ячейки заранее посчитаны для каждого уровня зума при загрузке датасета. Ответ
+    отдается с ETag, повторный запрос с If-None-Match получает 304.
+
+    Args:
+        request (Request): запрос
+        zoom (int): уровень зума карты
+        bbox (str): область видимости
+        session (AsyncSession): асинхронная сессия
+
+    Returns:
+        NoiseHeatmapScheme: ячейки теплокарты
+    """
+
+    try:
+        parsed_bbox = _parse_bbox(bbox) if bbox is not None else None
+
+        etag, heatmap = await NoiseService().get_heatmap(zoom=zoom, bbox=parsed_bbox,
+                                                         if_none_match=request.headers.get('if-none-match'))
+        headers = {'ETag': etag, 'Cache-Control': 'max-age=300'}
+
+        if heatmap is None:
+            return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+
+        return JSONResponse(content=heatmap, headers=headers)
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        logger.exception('Unexpected error in get_noise_heatmap: %s', e)
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail='Unexpected error while getting noise heatmap'
+        )
+
+
+@router.get('/nearest', response_model=List[dict])
+async def get_nearest_noise_points(lat: float = Query(description='Широта'),
+                                   lon: float = Query(description='Долгота'),
+                                   k: int = Query(5, ge=1, le=100, description='Количество ближайших адресов'),
+                                   session: AsyncSession = Depends(get_async_session)):
+    """Роут для получения ближайших к точке шумных адресов.
+
+    Args:
+        lat (float): широта
+        lon (float): долгота
+        k (int): количество ближайших адресов
+        session (AsyncSession): асинхронная сессия
+
+    Returns:
+        List[dict]: шумные адреса с расстоянием в метрах, от ближайшего
+    """
+
+    try:
+        nearest_points = await NoiseService().get_nearest_noise_points(lat=lat, lon=lon, k=k)
+
+        return nearest_points
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        logger.exception('Unexpected error in get_nearest_noise_points: %s', e)
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail='Unexpected error while getting nearest noise points'
+        )
+
+
+@router.post('/nearest/batch', response_model=List[NoiseNearestScheme])
+async def get_nearest_noise_points_batch(batch: NoiseNearestBatchScheme,
+                                         session: AsyncSession = Depends(get_async_session)):
+    """Роут для получения ближайших шумных адресов сразу для списка точек (например, маршрута).
+
+    Args:
+        batch (NoiseNearestBatchScheme): точки и количество ближайших адресов
+        session (AsyncSession): асинхронная сессия
+
+    Returns:
+        List[NoiseNearestScheme]: ближайшие шумные адреса для каждой точки в порядке запроса
+    """
+
+    try:
+        points = [(point.latitude, point.longitude) for point in batch.points]
+        nearest_points = await NoiseService().get_nearest_noise_points_batch(points=points, k=batch.k)
+
+        return [NoiseNearestScheme(**nearest) for nearest in nearest_points]
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        logger.exception('Unexpected error in get_nearest_noise_points_batch: %s', e)
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail='Unexpected error while getting nearest noise points'
+        )
@@ -1,6 +1,20 @@
+from typing import List, Optional
+
 from pydantic import BaseModel, Field
 
 
 class WarningGetScheme(BaseModel):
     latitude: float = Field(..., description='Широта')
-    longitude: float = Field(..., description='Долгота')
\ No newline at end of file
+    longitude: float = Field(..., description='Долгота')
+
+
+class WarningBatchScheme(BaseModel):
+    points: Optional[List[WarningGetScheme]] = Field(None, max_length=1000, description='Точки')
+    route_id: Optional[int] = Field(None, description='Идентификатор маршрута')
+
+
+class WarningPointScheme(BaseModel):
+    latitude: float = Field(..., description='Широта')
+    longitude: float = Field(..., description='Долгота')
+
+    warnings: List[str] = Field(..., description='Погодные предупреждения')
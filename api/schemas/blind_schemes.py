@@ -1,9 +1,15 @@
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from fastapi import File
 
 
 class ImageDescribeScheme(BaseModel):
     description: Optional[str] = File(None, description='Описание изображения')
 
+
+class BlindJobScheme(BaseModel):
+    id: str = Field(..., description='Идентификатор задачи')
+    status: str = Field(..., description='Статус задачи: queued, running, done или failed')
+    result: Optional[str] = Field(None, description='Тифлокомментарий, когда задача выполнена')
+    error: Optional[str] = Field(None, description='Текст ошибки, если задача завершилась неудачно')
@@ -35,6 +35,8 @@ class EventReadScheme(BaseModel):
 
 
 class EventCreateScheme(BaseModel):
+    uuid: Optional[str] = Field(None, description='Внешний идентификатор (при повторе событие обновляется)')
+
     category_id: Optional[int] = Field(None, description='Идентификатор категории')
 
     address: Optional[str] = Field(None, description='Адрес')
@@ -48,6 +50,20 @@ class EventCreateScheme(BaseModel):
 
     geom: Optional[list] = Field(None, description='Геометрические метки')
 
+    @field_validator('geom')
+    @classmethod
+    def check_geom_points(cls, v):  # type: ignore
+        # Геометрия хранится упакованными парами (lat, lon), поэтому принимаются только такие точки
+        if v is None:
+            return v
+
+        for point in v:
+            if not isinstance(point, dict) or not isinstance(point.get('lat'), (int, float)) \
+                    or not isinstance(point.get('lon'), (int, float)):
+                raise ValueError('geom must be a list of {"lat": float, "lon": float} points')
+
+        return v
+
     @field_validator('start_datetime', 'end_datetime', mode='before')
     @classmethod
     def convert_aware_to_naive_utc(cls, v):  # type: ignore
@@ -0,0 +1,35 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class NoiseHeatmapCellScheme(BaseModel):
+    latitude: float = Field(..., description='Широта центра ячейки')
+    longitude: float = Field(..., description='Долгота центра ячейки')
+
+    count: int = Field(..., description='Количество шумных адресов в ячейке')
+    noise_ratio: float = Field(..., description='Средняя доля шумных обращений')
+    total_complaints: int = Field(..., description='Суммарное количество обращений')
+
+
+class NoiseHeatmapScheme(BaseModel):
+    zoom: int = Field(..., description='Уровень зума, для которого посчитаны ячейки')
+
+    cells: List[NoiseHeatmapCellScheme] = Field(..., description='Ячейки теплокарты')
+
+
+class NoisePointScheme(BaseModel):
+    latitude: float = Field(..., description='Широта')
+    longitude: float = Field(..., description='Долгота')
+
+
+class NoiseNearestBatchScheme(BaseModel):
+    points: List[NoisePointScheme] = Field(..., max_length=1000, description='Точки, например точки маршрута')
+    k: int = Field(5, ge=1, le=100, description='Количество ближайших шумных адресов для каждой точки')
+
+
+class NoiseNearestScheme(BaseModel):
+    latitude: float = Field(..., description='Широта точки запроса')
+    longitude: float = Field(..., description='Долгота точки запроса')
+
+    nearest: List[dict] = Field(..., description='Ближайшие шумные адреса с расстоянием в метрах')
@@ -1,9 +1,10 @@
-from typing import List
+from typing import Dict, List
 
 from fastapi.params import Depends
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload
 
 from api.database import get_async_session
@@ -32,6 +33,9 @@ class EventDAO:
         return None
 
     async def create(self, data: dict) -> dict:
+        if data.get('uuid'):
+            return await self.upsert(data=data)
+
         event_obj = self._db(**data)
 
         self.session.add(event_obj)
@@ -39,6 +43,42 @@ class EventDAO:
 
         return event_obj.as_dict()
 
+    def _upsert_statement(self, columns):
+        """INSERT ... ON CONFLICT (uuid) DO UPDATE: событие с тем же uuid обновляется"""
+        stmt = pg_insert(self._db)
+
+        return stmt.on_conflict_do_update(
+            index_elements=[self._db.uuid],
+            set_={column: stmt.excluded[column] for column in columns if column not in ('id', 'uuid')}
+        )
+
+    async def upsert(self, data: dict) -> dict:
+        # Core INSERT не вызывает валидаторы модели, поэтому bbox считается здесь
+        data = {**data, **self._db.bbox_columns(data.get('geom'))}
+        stmt = self._upsert_statement(data).values(**data).returning(self._db)
+        event_obj = (await self.session.scalars(stmt)).one()
+
+        await self.session.commit()
+
+        return event_obj.as_dict()
+
+    async def create_many(self, data: List[dict]) -> List[int]:
+        """
+        Вставляет события пачкой (многострочный INSERT ... RETURNING), id возвращаются в порядке data.
+        События с уже известным uuid обновляются, uuid внутри пачки не должны повторяться.
+        """
+        if not data:
+            return []
+
+        data = [{**row, **self._db.bbox_columns(row.get('geom'))} for row in data]
+        stmt = self._upsert_statement(data[0]).returning(self._db.id, sort_by_parameter_order=True)
+        result = await self.session.execute(stmt, data)
+        event_ids = list(result.scalars())
+
+        await self.session.commit()
+
+        return event_ids
+
     async def get_random_list(self, count: int) -> List[dict]:
         if count <= 0:
             return []
@@ -76,4 +116,27 @@ class EventCategoryDAO:
 
         return category.as_dict() if category else None
 
+    async def get_or_create_many(self, names: List[str], create_missing: bool = True) -> Dict[str, int]:
+        """Идентификаторы категорий по названиям одним запросом, недостающие создаются одной вставкой"""
+        if not names:
+            return {}
+
+        result = await self.session.execute(select(self._db.name, self._db.id).where(self._db.name.in_(names)))
+        categories = dict(result.all())
+
+        missing = [name for name in names if name not in categories]
+
+        if missing and create_missing:
+            stmt = pg_insert(self._db).values([{'name': name} for name in missing]).on_conflict_do_nothing(
+                index_elements=[self._db.name]
+            ).returning(self._db.name, self._db.id)
+            categories.update((await self.session.execute(stmt)).all())
+
+            # Категории, которые успел создать кто-то другой, при конфликте не возвращаются
+            if len(categories) < len(names):
+                result = await self.session.execute(select(self._db.name, self._db.id).where(self._db.name.in_(missing)))
+                categories.update(result.all())
+
+            await self.session.commit()
 
+        return categories
@@ -1,11 +1,24 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import time
+
+import httpx
 import requests
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, List
+
+from api.utils.rate_limit import TokenBucket
 
 from settings import config_parameters
 
 
+logger = logging.getLogger(__name__)
+
+
 class DgisGeocoder:
     """
     Простой клиент для прямого геокодирования 2GIS:
@@ -106,4 +119,196 @@ class DgisGeocoder:
             return None
 
         full_id = items[0].get("id") or ""
-        return full_id.split("_", 1)[0] if "_" in full_id else full_id or None
\ No newline at end of file
+        return full_id.split("_", 1)[0] if "_" in full_id else full_id or None
+
+
+def normalize_address(address: str) -> str:
+    """Приводит адрес к виду для ключа кеша: регистр, ё, пробелы и запятые"""
+    address = address.lower().replace("ё", "е")
+    address = re.sub(r"\s*,\s*", ", ", address)
+    address = re.sub(r"\s+", " ", address)
+
+    return address.strip(" ,.")
+
+
+class GeocodeCache:
+    """
+    Кеш геокодирования в SQLite: ключ - нормализованный адрес и город.
+    Адреса, которые 2GIS не нашел, тоже сохраняются (с пустыми координатами), чтобы не запрашивать их повторно.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Парсер обращается к кешу из фонового потока геокодирования
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS geocode_cache ("
+            "address TEXT NOT NULL, city TEXT NOT NULL, lat REAL, lon REAL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (address, city))"
+        )
+        self.connection.commit()
+
+    def get_many(self, addresses: List[str], city: str) -> Dict[str, Optional[Tuple[float, float]]]:
+        """Возвращает найденные в кеше адреса (нормализованные) -> координаты или None"""
+        found = {}
+
+        for start in range(0, len(addresses), 500):
+            chunk = addresses[start:start + 500]
+            rows = self.connection.execute(
+                f"SELECT address, lat, lon FROM geocode_cache WHERE city = ? "
+                f"AND address IN ({', '.join('?' * len(chunk))})",
+                [city, *chunk]
+            )
+
+            for address, lat, lon in rows:
+                found[address] = (lat, lon) if lat is not None and lon is not None else None
+
+        return found
+
+    def set_many(self, results: Dict[str, Optional[Tuple[float, float]]], city: str):
+        now = time.time()
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO geocode_cache (address, city, lat, lon, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(address, city, *(coords or (None, None)), now) for address, coords in results.items()]
+            )
+
+    def close(self):
+        self.connection.close()
+
+
+class AsyncDgisGeocoder:
+    """
+    Асинхронный клиент геокодирования 2GIS для пакетной обработки адресов:
+    - общий пул соединений httpx;
+    - не больше concurrency одновременных запросов и не больше rate запросов в секунду;
+    - кеш в SQLite (cache_path), повторные запуски не ходят в сеть за известными адресами.
+    """
+
+    BASE_URL = DgisGeocoder.BASE_URL
+
+    def __init__(
+        self,
+        *,
+        cache_path: Optional[str] = None,
+        timeout: float = 5.0,
+        concurrency: int = 8,
+        rate: float = 10.0,
+        retries: int = 3,
+    ):
+        self.api_key = config_parameters.GIS_API_KEY
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+
+        self.cache = GeocodeCache(cache_path) if cache_path else None
+
+        self.requests_made = 0
+        self.cache_hits = 0
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bucket: Optional[TokenBucket] = None
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        # Клиент и примитивы создаются в том цикле событий, где геокодер используется
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._bucket = TokenBucket(rate=self.rate)
+
+        return self._client
+
+    async def geocode(self, address: str, city: str = "Москва") -> Optional[Tuple[float, float]]:
+        """Координаты (lat, lon) адреса в городе или None, если ничего не найдено"""
+        return (await self.geocode_many([address], city=city))[address]
+
+    async def geocode_many(self, addresses: List[str], city: str = "Москва") -> Dict[str, Optional[Tuple[float, float]]]:
+        """
+        Геокодирует список адресов. Возвращает словарь исходный адрес -> (lat, lon) или None.
+        Адреса, которые не удалось запросить из-за ошибки сети, тоже получают None, но не кешируются.
+        """
+        keys = {address: normalize_address(address) for address in addresses}
+        # Для запроса берем первое написание адреса, дубли после нормализации запрашиваются один раз
+        originals = {}
+        for address, key in keys.items():
+            originals.setdefault(key, address)
+        unique_keys = list(originals)
+
+        resolved = self.cache.get_many(unique_keys, city) if self.cache else {}
+        self.cache_hits += len(resolved)
+
+        missing = [key for key in unique_keys if key not in resolved]
+
+        if missing:
+            client = self._ensure_client()
+            fetched = await asyncio.gather(*(self._fetch(client, f"{city}, {originals[key]}") for key in missing))
+            found = {key: coords for key, (ok, coords) in zip(missing, fetched) if ok}
+
+            if self.cache and found:
+                self.cache.set_many(found, city)
+
+            resolved.update(found)
+
+        return {address: resolved.get(key) for address, key in keys.items()}
+
+    async def _fetch(self, client: httpx.AsyncClient, query: str) -> Tuple[bool, Optional[Tuple[float, float]]]:
+        """Возвращает (запрос выполнен, координаты)"""
+        params = {
+            "q": query,
+            "key": self.api_key,
+            "fields": "items.point",
+            "page_size": 1,
+        }
+
+        async with self._semaphore:
+            for attempt in range(self.retries):
+                await self._bucket.acquire()
+                self.requests_made += 1
+
+                try:
+                    resp = await client.get(self.BASE_URL, params=params)
+
+                    if resp.status_code == 429 or resp.status_code >= 500:
+                        await asyncio.sleep(2 ** attempt)
+                        continue
+
+                    resp.raise_for_status()
+                    data = resp.json()
+
+                except (httpx.HTTPError, ValueError) as e:
+                    logger.warning("Geocoding request for %r failed: %s", query, e)
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+
+                items = (data.get("result") or {}).get("items") or []
+                for item in items:
+                    p = item.get("point")
+                    if p and "lat" in p and "lon" in p:
+                        return True, (p["lat"], p["lon"])
+
+                return True, None
+
+        return False, None
+
+    async def aclose(self):
+        """Закрывает пул соединений; при следующем запросе он будет создан заново"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def close(self):
+        """Закрывает кеш, после этого геокодер работает только через сеть"""
+        if self.cache:
+            self.cache.close()
+            self.cache = None
@@ -1,8 +1,46 @@
-import aiohttp
-from typing import Optional
+import asyncio
+import json
+import time
+
+from typing import AsyncIterator
+
+from api.utils.http_clients import get_llm_session
+from api.utils.metrics import LatencyStats
+
+from settings import config_parameters
+
+
+class LLMMetrics:
+    """Время ожидания в очереди к OpenRouter, время самого запроса и время до первого фрагмента ответа"""
+
+    def __init__(self):
+        self.queue_time = LatencyStats()
+        self.upstream_time = LatencyStats()
+        self.first_chunk_time = LatencyStats()  # для потоковых ответов, считая ожидание в очереди
+        self.waiting = 0
+        self.in_flight = 0
+        self.errors = 0
+
+    def as_dict(self) -> dict:
+        return {
+            'max_concurrency': config_parameters.LLM_MAX_CONCURRENCY,
+            'waiting': self.waiting,
+            'in_flight': self.in_flight,
+            'errors': self.errors,
+            'queue_time': self.queue_time.as_dict(),
+            'upstream_time': self.upstream_time.as_dict(),
+            'first_chunk_time': self.first_chunk_time.as_dict()
+        }
+
+
+# Ограничение одновременных запросов к OpenRouter на процесс, остальные ждут своей очереди
+llm_semaphore = asyncio.Semaphore(config_parameters.LLM_MAX_CONCURRENCY)
+llm_metrics = LLMMetrics()
 
 
 class LLMService:
+    ERROR_PREFIX = "Ошибка при отправке запроса: "
+
     def __init__(self, openrouter_api_key: str):
         self.api_key = openrouter_api_key
         self.base_url = "https://openrouter.ai/api/v1/chat/completions"
@@ -21,6 +59,80 @@ class LLMService:
             str: ответ от модели.
         """
 
+        payload = self._build_payload(system_prompt=system_prompt, image_base64=image_base64,
+                                      user_content=user_content)
+
+        try:
+            return await self._post(payload=payload, headers=self._headers())
+        except Exception as e:
+            llm_metrics.errors += 1
+            return f"{self.ERROR_PREFIX}{str(e)}"
+
+    async def stream_query(self, system_prompt: str, image_base64: str,
+                           user_content: str = None) -> AsyncIterator[str]:
+        """
+        Создает тифлокомментарий для изображения, отдавая текст по мере генерации.
+
+        Args:
+            system_prompt (str): системный промпт.
+            user_content (str): текстовый запрос пользователя.
+            image_base64 (str, optional): изображение в формате base64. По умолчанию None.
+
+        Yields:
+            str: очередной фрагмент ответа модели.
+
+        Raises:
+            Exception: если OpenRouter вернул ошибку.
+        """
+
+        payload = self._build_payload(system_prompt=system_prompt, image_base64=image_base64,
+                                      user_content=user_content, stream=True)
+
+        queued_at = time.perf_counter()
+        started_at = await self._acquire(queued_at)
+        first_chunk = True
+
+        try:
+            async with get_llm_session().post(self.base_url, json=payload, headers=self._headers()) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise Exception(f"OpenRouter API error: {response.status} - {error_text}")
+
+                # SSE: строки "data: {...}", комментарии ": ..." и завершающий "data: [DONE]"
+                async for line in response.content:
+                    line = line.strip()
+
+                    if not line.startswith(b"data:"):
+                        continue
+
+                    data = line[5:].strip()
+
+                    if data == b"[DONE]":
+                        break
+
+                    chunk = json.loads(data)
+
+                    if "error" in chunk:
+                        raise Exception(f"OpenRouter API error: {chunk['error']}")
+
+                    delta = chunk["choices"][0].get("delta", {}).get("content")
+
+                    if delta:
+                        if first_chunk:
+                            first_chunk = False
+                            llm_metrics.first_chunk_time.observe(time.perf_counter() - queued_at)
+
+                        yield delta
+
+        except Exception:
+            llm_metrics.errors += 1
+            raise
+
+        finally:
+            self._release(started_at)
+
+    def _build_payload(self, system_prompt: str, image_base64: str, user_content: str = None,
+                       stream: bool = False) -> dict:
         messages = [{"role": "system", "content": system_prompt}]
 
         user_message_content = [{"type": "text", "text": user_content}]
@@ -47,21 +159,51 @@ class LLMService:
             "top_p": 0.9
         }
 
-        headers = {
+        if stream:
+            payload["stream"] = True
+
+        return payload
+
+    def _headers(self) -> dict:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "HTTP-Referer": "https://github.com/Hallteon/Shedevro.Sber-API",
             "X-Title": "BlindLLMService"
         }
 
+    @staticmethod
+    async def _acquire(queued_at: float) -> float:
+        """Ждет свободного места среди одновременных запросов, возвращает момент начала запроса"""
+        llm_metrics.waiting += 1
+
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.base_url, json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result["choices"][0]["message"]["content"]
-                    else:
-                        error_text = await response.text()
-                        raise Exception(f"OpenRouter API error: {response.status} - {error_text}")
-        except Exception as e:
-            return f"Ошибка при отправке запроса: {str(e)}"
\ No newline at end of file
+            await llm_semaphore.acquire()
+        finally:
+            llm_metrics.waiting -= 1
+
+        started_at = time.perf_counter()
+        llm_metrics.queue_time.observe(started_at - queued_at)
+        llm_metrics.in_flight += 1
+
+        return started_at
+
+    @staticmethod
+    def _release(started_at: float):
+        llm_metrics.in_flight -= 1
+        llm_metrics.upstream_time.observe(time.perf_counter() - started_at)
+        llm_semaphore.release()
+
+    async def _post(self, payload: dict, headers: dict) -> str:
+        started_at = await self._acquire(time.perf_counter())
+
+        try:
+            async with get_llm_session().post(self.base_url, json=payload, headers=headers) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    return result["choices"][0]["message"]["content"]
+                else:
+                    error_text = await response.text()
+                    raise Exception(f"OpenRouter API error: {response.status} - {error_text}")
+        finally:
+            self._release(started_at)
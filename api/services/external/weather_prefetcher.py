@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Optional, Tuple
+
+from api.services.external.warning_service import (WarningService, weather_cache, warnings_cache,
+                                                   tile_requests)
+from api.utils.metrics import LatencyStats, hit_rate
+
+from settings import config_parameters
+
+
+logger = logging.getLogger(__name__)
+
+
+class WeatherPrefetcher:
+    """Фоновое обновление погоды для самых запрашиваемых тайлов.
+
+    Раз в interval секунд берет hot_tiles самых популярных тайлов и заново запрашивает
+    те, у которых до истечения TTL осталось меньше refresh_margin секунд, но не больше
+    refresh_budget запросов в минуту. Счетчики популярности затухают вдвое за цикл.
+    """
+
+    def __init__(self, hot_tiles: int = 50, refresh_margin: float = 300, refresh_budget: int = 30,
+                 interval: float = 30):
+        self.hot_tiles = hot_tiles
+        self.refresh_margin = refresh_margin
+        self.refresh_budget = refresh_budget
+        self.interval = interval
+
+        self._task: Optional[asyncio.Task] = None
+        self._refreshed_at: deque = deque()
+
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.budget_exhausted = 0
+        # Насколько позже момента ttl - refresh_margin тайл реально обновился
+        self.refresh_lag = LatencyStats()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+
+            try:
+                await self.refresh_due_tiles()
+            except Exception as e:
+                logger.exception('Weather prefetch cycle failed: %s', e)
+
+    def _budget_left(self) -> int:
+        now = time.monotonic()
+
+        while self._refreshed_at and now - self._refreshed_at[0] >= 60:
+            self._refreshed_at.popleft()
+
+        return self.refresh_budget - len(self._refreshed_at)
+
+    async def refresh_due_tiles(self):
+        hot = sorted(tile_requests, key=tile_requests.get, reverse=True)[:self.hot_tiles]
+        refresh_at = weather_cache.ttl - self.refresh_margin
+
+        for tile in list(tile_requests):
+            tile_requests[tile] /= 2
+
+            if tile_requests[tile] < 0.5:
+                del tile_requests[tile]
+
+        for tile in hot:
+            age = weather_cache.age(tile)
+
+            if age is not None and age < refresh_at:
+                continue
+
+            if self._budget_left() <= 0:
+                self.budget_exhausted += 1
+                break
+
+            await self._refresh_tile(tile=tile, age=age, refresh_at=refresh_at)
+
+    async def _refresh_tile(self, tile: Tuple[int, int], age: Optional[float], refresh_at: float):
+        self._refreshed_at.append(time.monotonic())
+
+        timeline = await WarningService().load_tile_weather(tile)
+
+        if timeline is None:
+            self.refresh_failures += 1
+            return
+
+        weather_cache.set(tile, timeline)
+        warnings_cache.set(WarningService.warnings_cache_key(tile), tuple(timeline.warnings()))
+
+        self.refreshes += 1
+        # Тайл, которого не было в кеше, считаем просроченным на весь запас
+        self.refresh_lag.observe(max(0.0, (age if age is not None else weather_cache.ttl) - refresh_at))
+
+    def metrics(self) -> dict:
+        return {
+            'warnings_hit_rate': hit_rate(warnings_cache.hits, warnings_cache.misses),
+            'weather_hit_rate': hit_rate(weather_cache.hits, weather_cache.misses),
+            'warnings_cache': {'hits': warnings_cache.hits, 'misses': warnings_cache.misses,
+                               'coalesced': warnings_cache.coalesced, 'size': len(warnings_cache)},
+            'weather_cache': {'hits': weather_cache.hits, 'misses': weather_cache.misses,
+                              'coalesced': weather_cache.coalesced, 'size': len(weather_cache)},
+            'tracked_tiles': len(tile_requests),
+            'refreshes': self.refreshes,
+            'refresh_failures': self.refresh_failures,
+            'budget_exhausted': self.budget_exhausted,
+            'refresh_budget_left': self._budget_left(),
+            'refresh_lag': self.refresh_lag.as_dict()
+        }
+
+
+weather_prefetcher = WeatherPrefetcher(hot_tiles=config_parameters.WEATHER_PREFETCH_HOT_TILES,
+                                       refresh_margin=config_parameters.WEATHER_PREFETCH_MARGIN,
+                                       refresh_budget=config_parameters.WEATHER_PREFETCH_BUDGET,
+                                       interval=config_parameters.WEATHER_PREFETCH_INTERVAL)
@@ -0,0 +1,148 @@
+import datetime
+
+from dataclasses import dataclass
+from typing import Any, List, Optional, Set
+
+import numpy as np
+
+from api.utils.enums.warning_enum import EnvironmentWarning
+
+
+def _number(value: Any, default: float = 0.0) -> float:
+    return default if value is None else float(value)
+
+
+def _day_start_epoch(day: datetime.date) -> float:
+    """Локальная полночь дня в секундах epoch (как у datetime.fromtimestamp)"""
+    return datetime.datetime.combine(day, datetime.time.min).timestamp()
+
+
+@dataclass(frozen=True)
+class WeatherTimeline:
+    """Ответ Visual Crossing, разложенный в массивы по дням и по часам.
+
+    Строится один раз на ответ, правила снега, дождя и гололёда считаются масками по массивам.
+    """
+    day_epoch: np.ndarray
+    day_snowdepth: np.ndarray
+    day_snow: np.ndarray
+    day_precip: np.ndarray
+    day_tempmax: np.ndarray
+
+    hour_epoch: np.ndarray
+    hour_day: np.ndarray  # индекс дня, к которому относится час
+    hour_temp: np.ndarray
+    hour_dew: np.ndarray
+    hour_humidity: np.ndarray
+    hour_precip: np.ndarray
+
+    hour_rain: np.ndarray  # 'rain' в conditions или в preciptype
+    hour_snow: np.ndarray  # 'snow' в conditions или в preciptype
+    hour_has_precip: np.ndarray  # 'rain'/'snow' в conditions или непустой preciptype
+    hour_freezing_precip: np.ndarray  # ледяной дождь, мокрый снег, лёд
+
+    @classmethod
+    def from_weather_data(cls, weather_data: dict) -> 'WeatherTimeline':
+        days = weather_data.get('days') or []
+
+        hour_day: List[int] = []
+        hour_epoch: List[float] = []
+        hour_temp: List[float] = []
+        hour_dew: List[float] = []
+        hour_humidity: List[float] = []
+        hour_precip: List[float] = []
+        hour_rain: List[bool] = []
+        hour_snow: List[bool] = []
+        hour_has_precip: List[bool] = []
+        hour_freezing_precip: List[bool] = []
+
+        for day_index, day_data in enumerate(days):
+            for hour_data in day_data.get('hours') or []:
+                temp = _number(hour_data.get('temp'))
+                conditions = (hour_data.get('conditions') or '').lower()
+                precip_type = hour_data.get('preciptype') or []
+                precip_type_text = str(precip_type).lower()
+
+                hour_day.append(day_index)
+                hour_epoch.append(hour_data['datetimeEpoch'])
+                hour_temp.append(temp)
+                hour_dew.append(_number(hour_data.get('dew'), temp))
+                hour_humidity.append(_number(hour_data.get('humidity')))
+                hour_precip.append(_number(hour_data.get('precip')))
+
+                hour_rain.append('rain' in conditions or 'rain' in precip_type)
+                hour_snow.append('snow' in conditions or 'snow' in precip_type)
+                hour_has_precip.append('rain' in conditions or 'snow' in conditions or len(precip_type) > 0)
+                hour_freezing_precip.append(any(kind in precip_type_text for kind in ('freezing', 'sleet', 'ice')))
+
+        return cls(
+            day_epoch=np.array([day_data['datetimeEpoch'] for day_data in days], dtype=np.float64),
+            day_snowdepth=np.array([_number(day_data.get('snowdepth')) for day_data in days], dtype=np.float64),
+            day_snow=np.array([_number(day_data.get('snow')) for day_data in days], dtype=np.float64),
+            day_precip=np.array([_number(day_data.get('precip')) for day_data in days], dtype=np.float64),
+            day_tempmax=np.array([_number(day_data.get('tempmax')) for day_data in days], dtype=np.float64),
+            hour_epoch=np.array(hour_epoch, dtype=np.float64),
+            hour_day=np.array(hour_day, dtype=np.int32),
+            hour_temp=np.array(hour_temp, dtype=np.float64),
+            hour_dew=np.array(hour_dew, dtype=np.float64),
+            hour_humidity=np.array(hour_humidity, dtype=np.float64),
+            hour_precip=np.array(hour_precip, dtype=np.float64),
+            hour_rain=np.array(hour_rain, dtype=np.bool_),
+            hour_snow=np.array(hour_snow, dtype=np.bool_),
+            hour_has_precip=np.array(hour_has_precip, dtype=np.bool_),
+            hour_freezing_precip=np.array(hour_freezing_precip, dtype=np.bool_)
+        )
+
+    def warnings(self, now: Optional[datetime.datetime] = None) -> Set[str]:
+        now = now or datetime.datetime.now()
+        today = now.date()
+
+        today_start = _day_start_epoch(today)
+        tomorrow_start = _day_start_epoch(today + datetime.timedelta(days=1))
+
+        warnings_set = set()
+
+        # Снег за последние 7 дней (включая сегодня)
+        last_week = (self.day_epoch >= _day_start_epoch(today - datetime.timedelta(days=7))) & \
+                    (self.day_epoch < tomorrow_start)
+
+        # Снежный покров больше 50мм
+        if np.any(self.day_snowdepth[last_week] > 50):
+            warnings_set.add(EnvironmentWarning.SNOW_WEATHER.value)
+
+        # При максимальной температуре <= 2°C считаем, что все осадки были снегом
+        snow_fall = np.where(self.day_tempmax <= 2, self.day_precip, self.day_snow)
+        if snow_fall[last_week].sum() > 500:  # 500мм за неделю
+            warnings_set.add(EnvironmentWarning.SNOW_WEATHER.value)
+
+        # Прогноз на ближайшие 10 часов (только для текущего дня)
+        today_days = np.flatnonzero((self.day_epoch >= today_start) & (self.day_epoch < tomorrow_start))
+
+        if not len(today_days):
+            return warnings_set
+
+        utc_offset = now.astimezone().utcoffset().total_seconds()
+        hour_of_day = ((self.hour_epoch + utc_offset) // 3600) % 24
+
+        upcoming = np.flatnonzero((self.hour_day == today_days[0]) & (hour_of_day >= now.hour))[:10]
+
+        temp = self.hour_temp[upcoming]
+        dew = self.hour_dew[upcoming]
+        humidity = self.hour_humidity[upcoming]
+        precip = self.hour_precip[upcoming]
+
+        if np.any(self.hour_rain[upcoming]):
+            warnings_set.add(EnvironmentWarning.RAIN_WEATHER.value)
+
+        # Осадки при температуре <= 1°C считаем снегом
+        if np.any(self.hour_snow[upcoming] | ((precip > 0) & (temp <= 1))):
+            warnings_set.add(EnvironmentWarning.SNOW_WEATHER.value)
+
+        # Гололёд: по температуре и точке росы, по типу осадков, по влажности и морозу при осадках
+        freezing_conditions = (temp >= -2) & (temp <= 1) & (np.abs(temp - dew) <= 1)
+        high_humidity_freeze = (temp <= 0) & (humidity > 85) & self.hour_has_precip[upcoming]
+
+        if np.any(self.hour_freezing_precip[upcoming] | freezing_conditions | high_humidity_freeze):
+            warnings_set.add(EnvironmentWarning.ICE_WEATHER.value)
+
+        return warnings_set
@@ -1,8 +1,17 @@
+import asyncio
+import base64
+import hashlib
+
+from typing import AsyncIterator, Optional, Tuple
+
 from fastapi.params import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.database import get_async_session
 
+from api.services.internal.job_queue import JobQueue, InMemoryJobBackend, RedisJobBackend
+from api.utils.cache_utils import PerceptualResultCache
+from api.utils.image_utils import prepare_llm_image, image_dhash
 from api.utils.llm_promts import (image_describe_prompt, map_describe_prompt, user_request_template,
                                   user_map_request_prompt)
 from api.services.external.llm_service import LLMService
@@ -10,16 +19,116 @@ from api.services.external.llm_service import LLMService
 from settings import config_parameters
 
 
+# Тифлокомментарии по почти одинаковым фото (повторная отправка того же входа)
+description_cache = PerceptualResultCache(maxsize=config_parameters.LLM_CACHE_MAXSIZE,
+                                          ttl=config_parameters.LLM_CACHE_TTL,
+                                          threshold=config_parameters.LLM_CACHE_HAMMING_THRESHOLD,
+                                          persist_path=config_parameters.LLM_CACHE_PATH,
+                                          save_interval=config_parameters.LLM_CACHE_SAVE_INTERVAL)
+
+# Фоновые задачи на тифлокомментарии для режима async_mode
+description_jobs = JobQueue(
+    backend=RedisJobBackend(url=config_parameters.LLM_JOB_REDIS_URL, ttl=config_parameters.LLM_JOB_TTL)
+    if config_parameters.LLM_JOB_REDIS_URL else InMemoryJobBackend(ttl=config_parameters.LLM_JOB_TTL),
+    workers=config_parameters.LLM_JOB_WORKERS,
+    maxsize=config_parameters.LLM_JOB_QUEUE_SIZE
+)
+
+
 class BlindHelpService:
     def __init__(self, session: AsyncSession = Depends(get_async_session)):
         self.session = session
 
-    async def create_description(self, image: str, description: str = None) -> str:
+    async def create_description(self, image: bytes, description: str = None) -> str:
+        image, image_hash = await self._prepare_image(image)
+        system_prompt, user_content = self._description_prompts(image=image, description=description)
+
+        return await self._cached_query(system_prompt=system_prompt, user_content=user_content, image=image,
+                                        image_hash=image_hash, context=f'{system_prompt}\n{description or ""}')
+
+    async def submit_description(self, image: bytes, description: str = None) -> dict:
+        """Ставит создание тифлокомментария в очередь и возвращает задачу.
+
+        Raises:
+            QueueFullError: если очередь задач заполнена
+        """
+
+        async def job() -> str:
+            llm_response = await self.create_description(image=image, description=description)
+
+            if llm_response.startswith(LLMService.ERROR_PREFIX):
+                raise Exception(llm_response)
+
+            return llm_response
+
+        return await description_jobs.submit(job)
+
+    async def stream_description(self, image: bytes, description: str = None) -> AsyncIterator[str]:
+        """Тифлокомментарий по частям по мере генерации. Ответ из кеша отдается одним фрагментом"""
+        image, image_hash = await self._prepare_image(image)
+        system_prompt, user_content = self._description_prompts(image=image, description=description)
+        context = self._context_key(f'{system_prompt}\n{description or ""}')
+
+        if image_hash is not None:
+            cached_response = description_cache.lookup(context=context, image_hash=image_hash)
+
+            if cached_response is not None:
+                yield cached_response
+                return
+
+        chunks = []
+
+        async for chunk in LLMService(
+            openrouter_api_key=config_parameters.OPENROUTER_API_KEY
+        ).stream_query(
+            system_prompt=system_prompt,
+            user_content=user_content,
+            image_base64=image
+        ):
+            chunks.append(chunk)
+            yield chunk
+
+        if image_hash is not None and chunks:
+            self._store(context=context, image_hash=image_hash, response=''.join(chunks))
+
+    async def get_user_map_position(self, image: bytes):
+        image, image_hash = await self._prepare_image(image)
+
+        system_prompt = map_describe_prompt
+        user_content = user_map_request_prompt.format(image_length=len(image))
+
+        return await self._cached_query(system_prompt=system_prompt, user_content=user_content, image=image,
+                                        image_hash=image_hash, context=system_prompt)
+
+    @staticmethod
+    def _description_prompts(image: str, description: str = None) -> Tuple[str, str]:
         system_prompt = image_describe_prompt
         user_content = user_request_template.format(image_length=len(image),
                                                     additional_info=f"ДОПОЛНИТЕЛЬНАЯ ИНФОРМАЦИЯ ОТ ПОЛЬЗОВАТЕЛЯ: "
                                                                     f"{description}" if description else "Дополнительной информации от пользователя нет.")
 
+        return system_prompt, user_content
+
+    @staticmethod
+    def _context_key(context: str) -> str:
+        return hashlib.sha1(context.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _store(context: str, image_hash: int, response: str):
+        description_cache.set(context=context, image_hash=image_hash, value=response)
+        description_cache.schedule_save()
+
+    async def _cached_query(self, system_prompt: str, user_content: str, image: str, image_hash: Optional[int],
+                            context: str) -> str:
+        """Запрос к LLM через кеш по перцептивному хешу. Ответы с ошибкой не кешируются"""
+        context = self._context_key(context)
+
+        if image_hash is not None:
+            cached_response = description_cache.lookup(context=context, image_hash=image_hash)
+
+            if cached_response is not None:
+                return cached_response
+
         llm_response = await LLMService(
             openrouter_api_key=config_parameters.OPENROUTER_API_KEY
         ).send_query(
@@ -28,15 +137,21 @@ class BlindHelpService:
             image_base64=image
         )
 
+        if image_hash is not None and not llm_response.startswith(LLMService.ERROR_PREFIX):
+            self._store(context=context, image_hash=image_hash, response=llm_response)
+
         return llm_response
 
-    async def get_user_map_position(self, image: str):
-        system_prompt = map_describe_prompt
-        user_content = user_map_request_prompt.format(image_length=len(image))
+    @staticmethod
+    async def _prepare_image(contents: bytes) -> Tuple[str, Optional[int]]:
+        """Уменьшает и пережимает фото в пуле потоков, возвращает base64 для data URL и dHash"""
 
-        llm_response = await LLMService(
-            openrouter_api_key=config_parameters.OPENROUTER_API_KEY).send_query(system_prompt=system_prompt,
-                                                                                user_content=user_content,
-                                                                                image_base64=image)
+        def prepare() -> Tuple[bytes, Optional[int]]:
+            prepared = prepare_llm_image(contents, config_parameters.LLM_IMAGE_MAX_EDGE,
+                                         config_parameters.LLM_IMAGE_JPEG_QUALITY)
+
+            return prepared, image_dhash(prepared)
+
+        prepared, image_hash = await asyncio.to_thread(prepare)
 
-        return llm_response
\ No newline at end of file
+        return base64.b64encode(prepared).decode('utf-8'), image_hash
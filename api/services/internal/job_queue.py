@@ -0,0 +1,247 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus:
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """Очередь задач заполнена, новую задачу нужно отклонить"""
+
+
+class JobBackend:
+    """Хранилище состояния задач. Очередь и воркеры всегда локальные для процесса"""
+
+    async def save(self, job: dict):
+        raise NotImplementedError
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class InMemoryJobBackend(JobBackend):
+    def __init__(self, maxsize: int = 10000, ttl: float = 600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._jobs: OrderedDict = OrderedDict()  # id -> (время записи, задача)
+
+    async def save(self, job: dict):
+        self._jobs[job['id']] = (time.monotonic(), dict(job))
+        self._jobs.move_to_end(job['id'])
+
+        while len(self._jobs) > self.maxsize:
+            self._jobs.popitem(last=False)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        entry = self._jobs.get(job_id)
+
+        if entry is None:
+            return None
+
+        stored_at, job = entry
+
+        if time.monotonic() - stored_at >= self.ttl:
+            del self._jobs[job_id]
+            return None
+
+        return dict(job)
+
+
+class RedisJobBackend(JobBackend):
+    """Состояние задач в Redis, чтобы статус был виден из любого воркера uvicorn"""
+
+    def __init__(self, url: str, ttl: float = 600, prefix: str = 'blind_jobs:'):
+        self.url = url
+        self.ttl = ttl
+        self.prefix = prefix
+
+        self._redis = None
+
+    async def _connection(self):
+        if self._redis is None:
+            import aioredis
+
+            self._redis = await aioredis.create_redis_pool(self.url)
+
+        return self._redis
+
+    async def save(self, job: dict):
+        redis = await self._connection()
+
+        await redis.set(f'{self.prefix}{job["id"]}', json.dumps(job, ensure_ascii=False), expire=int(self.ttl))
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        redis = await self._connection()
+        value = await redis.get(f'{self.prefix}{job_id}', encoding='utf-8')
+
+        return json.loads(value) if value is not None else None
+
+    async def close(self):
+        if self._redis is not None:
+            self._redis.close()
+            await self._redis.wait_closed()
+            self._redis = None
+
+
+class JobQueue:
+    """Ограниченная очередь фоновых задач с пулом воркеров.
+
+    submit() ставит корутину в очередь и сразу возвращает id задачи, при заполненной
+    очереди бросает QueueFullError. Результат читается через get(), wait() позволяет
+    дождаться завершения задачи (long polling).
+    """
+
+    def __init__(self, backend: JobBackend, workers: int = 4, maxsize: int = 100, poll_interval: float = 0.5):
+        self.backend = backend
+        self.workers = workers
+        self.poll_interval = poll_interval
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._tasks = []
+        self._finished: Dict[str, asyncio.Event] = {}
+
+        self.rejected = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        await self.backend.close()
+
+    async def submit(self, job: Callable[[], Awaitable[Any]]) -> dict:
+        record = {'id': uuid.uuid4().hex, 'status': JobStatus.QUEUED, 'result': None, 'error': None}
+        saved = asyncio.get_running_loop().create_future()
+
+        # Место в очереди занимается до первого await: иначе между проверкой заполненности
+        # и постановкой в очередь его могут занять параллельные запросы
+        try:
+            self._queue.put_nowait((record, job, saved))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError('Job queue is full') from None
+
+        self._finished[record['id']] = asyncio.Event()
+
+        try:
+            await self.backend.save(record)
+        except BaseException:
+            # Воркер пропустит задачу, статус которой не удалось сохранить
+            saved.cancel()
+            self._finished.pop(record['id'], None)
+            raise
+
+        saved.set_result(None)
+
+        return record
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self.backend.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[dict]:
+        """Ждет завершения задачи не дольше timeout секунд и возвращает ее состояние"""
+        deadline = time.monotonic() + timeout
+
+        while True:
+            record = await self.backend.get(job_id)
+
+            if record is None or record['status'] in (JobStatus.DONE, JobStatus.FAILED):
+                return record
+
+            left = deadline - time.monotonic()
+
+            if left <= 0:
+                return record
+
+            event = self._finished.get(job_id)
+
+            # Задачи другого процесса (общий backend) опрашиваются с интервалом
+            try:
+                if event is not None:
+                    await asyncio.wait_for(event.wait(), timeout=left)
+                else:
+                    await asyncio.sleep(min(self.poll_interval, left))
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            'workers': self.workers,
+            'queued': self._queue.qsize(),
+            'maxsize': self._queue.maxsize,
+            'rejected': self.rejected
+        }
+
+    async def _worker(self):
+        while True:
+            record, job, saved = await self._queue.get()
+
+            try:
+                # Задача запускается только после сохранения статуса QUEUED, чтобы он не затер RUNNING
+                await asyncio.wait([saved])
+
+                if not saved.cancelled():
+                    await self._run(record, job)
+
+            except asyncio.CancelledError:
+                raise
+
+            # Ошибка хранилища не должна останавливать воркер, иначе очередь перестанет разбираться
+            except Exception as e:
+                logger.exception('Job worker error on job %s: %s', record['id'], e)
+
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, record: dict, job: Callable[[], Awaitable[Any]]):
+        try:
+            record['status'] = JobStatus.RUNNING
+            await self.backend.save(record)
+
+            record['result'] = await job()
+            record['status'] = JobStatus.DONE
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            logger.exception('Job %s failed: %s', record['id'], e)
+            record['status'] = JobStatus.FAILED
+            record['error'] = str(e)
+
+        try:
+            await self.backend.save(record)
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            logger.exception('Could not save status of job %s: %s', record['id'], e)
+
+        finally:
+            event = self._finished.pop(record['id'], None)
+
+            if event is not None:
+                event.set()
@@ -0,0 +1,169 @@
+import json
+import os
+from collections.abc import Sequence
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+# Колоночный бинарный формат датасета шума.
+#
+# Файл: MAGIC, длина заголовка (uint64 little-endian), JSON-заголовок с описанием массивов,
+# затем сами массивы, каждый выровнен по ALIGNMENT байт. Массивы читаются через np.memmap
+# без копирования и разбора. Строки (адреса, даты, частоты, источники шума) лежат один раз
+# в общей таблице строк, колонки хранят только их номера.
+MAGIC = b'NOISECOL'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+NUMERIC_COLUMNS = {
+    'latitude': np.float64,
+    'longitude': np.float64,
+    'noise_ratio': np.float64,
+    'total_complaints': np.int32,
+    'noisy_complaints': np.int32,
+    'is_noisy': np.bool_
+}
+STRING_COLUMNS = ('address', 'complaint_frequency', 'last_check_date')
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class StringTable:
+    """Строки в UTF-8 подряд и смещения начала каждой строки (последнее - конец таблицы)"""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return self.data[self.offsets[index]:self.offsets[index + 1]].tobytes().decode('utf-8')
+
+
+class StringColumn(Sequence):
+    """Строковая колонка: номер строки в таблице для каждой записи"""
+
+    def __init__(self, table: StringTable, ids: np.ndarray):
+        self.table = table
+        self.ids = ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, row: int) -> str:
+        return self.table[self.ids[row]]
+
+
+class StringListColumn(Sequence):
+    """Колонка списков строк: номера строк всех записей подряд и смещения начала списка каждой записи"""
+
+    def __init__(self, table: StringTable, ids: np.ndarray, offsets: np.ndarray):
+        self.table = table
+        self.ids = ids
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> Tuple[str, ...]:
+        return tuple(self.table[index] for index in self.ids[self.offsets[row]:self.offsets[row + 1]])
+
+
+class NoiseColumnsBuilder:
+    """Собирает колонки из записей в формате JSON-датасета и записывает их в бинарный файл"""
+
+    def __init__(self):
+        self.numeric: Dict[str, list] = {name: [] for name in NUMERIC_COLUMNS}
+        self.string_ids: Dict[str, List[int]] = {name: [] for name in STRING_COLUMNS}
+        self.source_ids: List[int] = []
+        self.source_offsets: List[int] = [0]
+
+        self._strings: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.source_offsets) - 1
+
+    def _string_id(self, value: str) -> int:
+        return self._strings.setdefault(value, len(self._strings))
+
+    def add(self, record: dict):
+        for name, values in self.numeric.items():
+            values.append(record.get(name) or 0)
+
+        for name, ids in self.string_ids.items():
+            ids.append(self._string_id(record.get(name) or ''))
+
+        self.source_ids.extend(self._string_id(source) for source in record.get('noise_sources', []))
+        self.source_offsets.append(len(self.source_ids))
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        encoded = [value.encode('utf-8') for value in self._strings]
+        string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=string_offsets[1:])
+
+        arrays = {name: np.asarray(values, dtype=NUMERIC_COLUMNS[name]) for name, values in self.numeric.items()}
+        arrays.update({f'{name}_ids': np.asarray(ids, dtype=np.int32) for name, ids in self.string_ids.items()})
+        arrays['noise_sources_ids'] = np.asarray(self.source_ids, dtype=np.int32)
+        arrays['noise_sources_offsets'] = np.asarray(self.source_offsets, dtype=np.int64)
+        arrays['strings'] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        arrays['string_offsets'] = string_offsets
+
+        return arrays
+
+    def save(self, path: str) -> int:
+        """Атомарно записывает колонки в path и возвращает количество записей"""
+        arrays = self.arrays()
+        layout, offset = {}, 0
+
+        for name, array in arrays.items():
+            layout[name] = {'dtype': array.dtype.str, 'offset': offset, 'length': len(array)}
+            offset = _align(offset + array.nbytes)
+
+        header = json.dumps({'format': FORMAT_VERSION, 'count': len(self), 'arrays': layout}).encode('utf-8')
+        data_start = _align(len(MAGIC) + 8 + len(header))
+        tmp_path = f'{path}.tmp'
+
+        with open(tmp_path, 'wb') as file:
+            file.write(MAGIC)
+            file.write(len(header).to_bytes(8, 'little'))
+            file.write(header)
+
+            for name, array in arrays.items():
+                file.seek(data_start + layout[name]['offset'])
+                file.write(array.tobytes())
+
+            file.truncate(data_start + offset)
+
+        os.replace(tmp_path, path)
+
+        return len(self)
+
+
+def load_noise_columns(path: str) -> Tuple[int, Dict[str, np.ndarray]]:
+    """Отображает файл в память и возвращает (количество записей, массивы по именам) без копирования"""
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+
+    if buffer[:len(MAGIC)].tobytes() != MAGIC:
+        raise ValueError(f'{path} is not a noise columns file')
+
+    header_start = len(MAGIC) + 8
+    header_size = int.from_bytes(buffer[len(MAGIC):header_start].tobytes(), 'little')
+    header = json.loads(buffer[header_start:header_start + header_size].tobytes())
+
+    if header['format'] != FORMAT_VERSION:
+        raise ValueError(f'Unsupported noise columns format: {header["format"]}')
+
+    data_start = _align(header_start + header_size)
+    arrays = {}
+
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        start = data_start + spec['offset']
+        arrays[name] = buffer[start:start + spec['length'] * dtype.itemsize].view(dtype)
+
+    return header['count'], arrays
@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+HEATMAP_MIN_ZOOM = 8
+HEATMAP_MAX_ZOOM = 17
+# Сколько ячеек теплокарты приходится на сторону тайла карты
+HEATMAP_CELLS_PER_TILE = 8
+
+
+def _mercator_fraction(latitude: np.ndarray, longitude: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Координаты в долях мира Web Mercator (0..1), как у тайлов карты"""
+    lat_rad = np.radians(np.clip(latitude, -85.05112878, 85.05112878))
+
+    x = (longitude + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0
+
+    return x, y
+
+
+def _mercator_to_latlon(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    longitude = x * 360.0 - 180.0
+    latitude = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * y))))
+
+    return latitude, longitude
+
+
+@dataclass(frozen=True)
+class HeatmapLevel:
+    """Агрегированные ячейки теплокарты для одного уровня зума"""
+    zoom: int
+
+    latitude: np.ndarray  # центр ячейки
+    longitude: np.ndarray
+    count: np.ndarray
+    noise_ratio: np.ndarray  # среднее по ячейке
+    total_complaints: np.ndarray  # сумма по ячейке
+
+    def cells(self, bbox: Optional[Tuple[float, float, float, float]] = None) -> List[dict]:
+        """Ячейки уровня, центр которых попадает в bbox (min_lon, min_lat, max_lon, max_lat)"""
+        positions = np.arange(len(self.count))
+
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            inside = ((self.latitude >= min_lat) & (self.latitude <= max_lat) &
+                      (self.longitude >= min_lon) & (self.longitude <= max_lon))
+            positions = positions[inside]
+
+        latitude = self.latitude[positions].tolist()
+        longitude = self.longitude[positions].tolist()
+        count = self.count[positions].tolist()
+        noise_ratio = self.noise_ratio[positions].round(3).tolist()
+        total_complaints = self.total_complaints[positions].tolist()
+
+        return [
+            {
+                'latitude': latitude[i],
+                'longitude': longitude[i],
+                'count': count[i],
+                'noise_ratio': noise_ratio[i],
+                'total_complaints': total_complaints[i]
+            }
+            for i in range(len(positions))
+        ]
+
+
+def build_heatmap_pyramid(latitude: np.ndarray, longitude: np.ndarray, noise_ratio: np.ndarray,
+                          total_complaints: np.ndarray, min_zoom: int = HEATMAP_MIN_ZOOM,
+                          max_zoom: int = HEATMAP_MAX_ZOOM) -> Dict[int, HeatmapLevel]:
+    """Считает пирамиду теплокарты: на каждом зуме точки бьются по ячейкам сетки тайлов"""
+    x, y = _mercator_fraction(latitude, longitude)
+    pyramid = {}
+
+    for zoom in range(min_zoom, max_zoom + 1):
+        cells_per_side = (1 << zoom) * HEATMAP_CELLS_PER_TILE
+
+        cell_x = np.floor(x * cells_per_side).astype(np.int64)
+        cell_y = np.floor(y * cells_per_side).astype(np.int64)
+
+        keys, inverse = np.unique((cell_x << 32) | cell_y, return_inverse=True)
+
+        count = np.bincount(inverse, minlength=len(keys))
+        ratio_sum = np.bincount(inverse, weights=noise_ratio, minlength=len(keys))
+        complaints_sum = np.bincount(inverse, weights=total_complaints, minlength=len(keys))
+
+        center_x = ((keys >> 32) + 0.5) / cells_per_side
+        center_y = ((keys & 0xFFFFFFFF) + 0.5) / cells_per_side
+        center_lat, center_lon = _mercator_to_latlon(center_x, center_y)
+
+        pyramid[zoom] = HeatmapLevel(
+            zoom=zoom,
+            latitude=center_lat,
+            longitude=center_lon,
+            count=count,
+            noise_ratio=np.divide(ratio_sum, count, out=np.zeros(len(keys)), where=count > 0),
+            total_complaints=np.rint(complaints_sum).astype(np.int64)
+        )
+
+    return pyramid
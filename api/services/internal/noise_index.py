@@ -0,0 +1,152 @@
+import math
+from typing import Tuple
+
+import numpy as np
+
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+
+def haversine_m(lat: float, lon: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Расстояние в метрах от точки до массива точек"""
+    lat_rad = math.radians(lat)
+    latitudes_rad = np.radians(latitudes)
+
+    dlat = latitudes_rad - lat_rad
+    dlon = np.radians(longitudes) - math.radians(lon)
+
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat_rad) * np.cos(latitudes_rad) * np.sin(dlon / 2) ** 2
+
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class NoiseGridIndex:
+    """Равномерная сетка по широте/долготе над подмножеством записей датасета.
+
+    Записи отсортированы по номеру ячейки (ячейки нумеруются построчно), поэтому
+    все ячейки одной строки сетки внутри прямоугольника лежат в массиве подряд и
+    выбираются одним срезом.
+    """
+
+    def __init__(self, latitude: np.ndarray, longitude: np.ndarray, rows: np.ndarray, cell_size: float = 0.01):
+        self.cell_size = cell_size
+
+        rows = np.asarray(rows, dtype=np.int32)
+        row_latitude = latitude[rows]
+        row_longitude = longitude[rows]
+
+        if len(rows):
+            self.min_lat = float(row_latitude.min())
+            self.min_lon = float(row_longitude.min())
+        else:
+            self.min_lat = self.min_lon = 0.0
+
+        cell_x = self._cell_x(row_longitude)
+        cell_y = self._cell_y(row_latitude)
+
+        self.nx = int(cell_x.max()) + 1 if len(rows) else 0
+        self.ny = int(cell_y.max()) + 1 if len(rows) else 0
+
+        cell_ids = cell_y * self.nx + cell_x
+        order = np.argsort(cell_ids, kind='stable')
+
+        self.rows = rows[order]
+        self.latitude = row_latitude[order]
+        self.longitude = row_longitude[order]
+        self.cell_starts = np.searchsorted(cell_ids[order], np.arange(self.nx * self.ny + 1))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _cell_x(self, longitude) -> np.ndarray:
+        return np.floor((np.asarray(longitude) - self.min_lon) / self.cell_size).astype(np.int64)
+
+    def _cell_y(self, latitude) -> np.ndarray:
+        return np.floor((np.asarray(latitude) - self.min_lat) / self.cell_size).astype(np.int64)
+
+    def _candidates(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> np.ndarray:
+        """Позиции записей из ячеек, пересекающих прямоугольник"""
+        if not len(self.rows):
+            return np.empty(0, dtype=np.int64)
+
+        x0 = max(int(self._cell_x(min_lon)), 0)
+        x1 = min(int(self._cell_x(max_lon)), self.nx - 1)
+        y0 = max(int(self._cell_y(min_lat)), 0)
+        y1 = min(int(self._cell_y(max_lat)), self.ny - 1)
+
+        if x0 > x1 or y0 > y1:
+            return np.empty(0, dtype=np.int64)
+
+        line_starts = np.arange(y0, y1 + 1) * self.nx
+        starts = self.cell_starts[line_starts + x0]
+        ends = self.cell_starts[line_starts + x1 + 1]
+
+        return np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+
+    def query_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> np.ndarray:
+        """Номера записей, попавших в прямоугольник"""
+        positions = self._candidates(min_lat, min_lon, max_lat, max_lon)
+
+        latitude = self.latitude[positions]
+        longitude = self.longitude[positions]
+        inside = (latitude >= min_lat) & (latitude <= max_lat) & (longitude >= min_lon) & (longitude <= max_lon)
+
+        return self.rows[positions[inside]]
+
+    def query_radius(self, lat: float, lon: float, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Номера записей в радиусе (метры) и расстояния до них, по возрастанию расстояния"""
+        dlat = radius / METERS_PER_DEGREE
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+
+        positions = self._candidates(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+        distances = haversine_m(lat, lon, self.latitude[positions], self.longitude[positions])
+
+        inside = distances <= radius
+        positions, distances = positions[inside], distances[inside]
+        order = np.argsort(distances, kind='stable')
+
+        return self.rows[positions[order]], distances[order]
+
+    def query_nearest(self, lat: float, lon: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """k ближайших записей и расстояния до них (метры), по возрастанию расстояния.
+
+        Квадрат ячеек вокруг точки расширяется, пока k-й найденный сосед не окажется
+        ближе, чем граница квадрата, либо квадрат не накроет всю сетку.
+        """
+        if k <= 0 or not len(self.rows):
+            return np.empty(0, dtype=self.rows.dtype), np.empty(0, dtype=np.float64)
+
+        k = min(k, len(self.rows))
+
+        cell_x = int(self._cell_x(lon))
+        cell_y = int(self._cell_y(lat))
+
+        # Сразу начинаем с квадрата, который дотягивается до сетки
+        reach = max(0, -cell_x, cell_x - (self.nx - 1), -cell_y, cell_y - (self.ny - 1))
+
+        while True:
+            covers_grid = (cell_x - reach <= 0 and cell_x + reach >= self.nx - 1 and
+                           cell_y - reach <= 0 and cell_y + reach >= self.ny - 1)
+
+            min_lat = self.min_lat + (cell_y - reach) * self.cell_size
+            min_lon = self.min_lon + (cell_x - reach) * self.cell_size
+            max_lat = self.min_lat + (cell_y + reach + 1) * self.cell_size
+            max_lon = self.min_lon + (cell_x + reach + 1) * self.cell_size
+
+            positions = self._candidates(min_lat, min_lon, max_lat, max_lon)
+
+            if len(positions) >= k:
+                distances = haversine_m(lat, lon, self.latitude[positions], self.longitude[positions])
+                nearest = np.argpartition(distances, k - 1)[:k]
+                nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+
+                # Гарантированно покрытое расстояние: от точки до ближайшей стороны квадрата
+                edge_cos = math.cos(math.radians(min(max(abs(min_lat), abs(max_lat)), 90.0)))
+                covered = min(lat - min_lat, max_lat - lat,
+                              (lon - min_lon) * edge_cos, (max_lon - lon) * edge_cos) * METERS_PER_DEGREE
+
+                if covers_grid or distances[nearest[-1]] <= covered:
+                    return self.rows[positions[nearest]], distances[nearest]
+
+            reach = max(1, reach * 2)
@@ -1,31 +1,90 @@
-import json
+import hashlib
+import logging
 import random
-from typing import List
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from api.services.internal.noise_heatmap import HEATMAP_MIN_ZOOM, HEATMAP_MAX_ZOOM
+from api.services.internal.noise_store import noise_store, NoiseSnapshot
+
+
+logger = logging.getLogger(__name__)
 
 
 class NoiseService:
     async def get_noise_points(self, count: int) -> List[dict]:
-        json_file_path = 'data/noise_analysis_results.json'
-
         try:
-            with open(json_file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
+            snapshot = await noise_store.get_snapshot()
+
+            return self._sample_records(snapshot=snapshot, rows=snapshot.noisy_rows, count=count)
 
-            noisy_points = [point for point in data if point.get('is_noisy') == True]
+        except Exception as e:
+            logger.exception('Could not get noise points: %s', e)
+            return []
 
-            if count >= len(noisy_points):
-                return noisy_points
+    async def get_noise_points_in_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                                       count: Optional[int] = None) -> List[dict]:
+        snapshot = await noise_store.get_snapshot()
+        rows = snapshot.noisy_index.query_bbox(min_lat=min_lat, min_lon=min_lon,
+                                               max_lat=max_lat, max_lon=max_lon)
 
-            return random.sample(noisy_points, count)
+        return self._sample_records(snapshot=snapshot, rows=rows, count=count)
 
-        except FileNotFoundError:
-            print(f"Файл {json_file_path} не найден")
-            return []
+    async def get_noise_points_in_radius(self, lat: float, lon: float, radius: float,
+                                         count: Optional[int] = None) -> List[dict]:
+        snapshot = await noise_store.get_snapshot()
+        rows, _ = snapshot.noisy_index.query_radius(lat=lat, lon=lon, radius=radius)
 
-        except json.JSONDecodeError:
-            print(f"Ошибка при чтении JSON файла {json_file_path}")
-            return []
+        return self._sample_records(snapshot=snapshot, rows=rows, count=count)
 
-        except Exception as e:
-            print(f"Произошла ошибка: {e}")
-            return []
\ No newline at end of file
+    async def get_nearest_noise_points(self, lat: float, lon: float, k: int) -> List[dict]:
+        snapshot = await noise_store.get_snapshot()
+
+        return self._nearest_records(snapshot=snapshot, lat=lat, lon=lon, k=k)
+
+    async def get_nearest_noise_points_batch(self, points: List[Tuple[float, float]], k: int) -> List[dict]:
+        """Ближайшие шумные адреса сразу для списка точек (lat, lon), на одном снимке датасета"""
+        snapshot = await noise_store.get_snapshot()
+
+        return [
+            {
+                'latitude': lat,
+                'longitude': lon,
+                'nearest': self._nearest_records(snapshot=snapshot, lat=lat, lon=lon, k=k)
+            }
+            for lat, lon in points
+        ]
+
+    async def get_heatmap(self, zoom: int, bbox: Optional[Tuple[float, float, float, float]] = None,
+                          if_none_match: Optional[str] = None) -> Tuple[str, Optional[dict]]:
+        """Возвращает ETag и теплокарту для зума. Если ETag совпал с if_none_match, теплокарта - None"""
+        snapshot = await noise_store.get_snapshot()
+        zoom = min(max(zoom, HEATMAP_MIN_ZOOM), HEATMAP_MAX_ZOOM)
+
+        etag_source = f'{snapshot.version}:{zoom}:{bbox}'.encode('utf-8')
+        etag = f'"{hashlib.md5(etag_source).hexdigest()}"'
+
+        if if_none_match == etag:
+            return etag, None
+
+        return etag, {'zoom': zoom, 'cells': snapshot.heatmap[zoom].cells(bbox=bbox)}
+
+    @staticmethod
+    def _nearest_records(snapshot: NoiseSnapshot, lat: float, lon: float, k: int) -> List[dict]:
+        rows, distances = snapshot.noisy_index.query_nearest(lat=lat, lon=lon, k=k)
+        records = []
+
+        for row, distance in zip(rows.tolist(), distances.tolist()):
+            record = snapshot.record(row)
+            record['distance'] = round(distance, 1)
+            records.append(record)
+
+        return records
+
+    @staticmethod
+    def _sample_records(snapshot: NoiseSnapshot, rows: np.ndarray, count: Optional[int] = None) -> List[dict]:
+        if count is not None and count < len(rows):
+            rows = [rows[position] for position in random.sample(range(len(rows)), count)]
+
+        return [snapshot.record(int(row)) for row in rows]
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from api.services.internal.noise_columns import StringColumn, StringListColumn, StringTable, load_noise_columns
+from api.services.internal.noise_heatmap import HeatmapLevel, build_heatmap_pyramid
+from api.services.internal.noise_index import NoiseGridIndex
+
+
+logger = logging.getLogger(__name__)
+
+NOISE_DATA_PATH = 'data/noise_analysis_results.json'
+# Колоночная копия датасета, которую пишет noise_parser.py; читается через mmap вместо разбора JSON
+NOISE_COLUMNS_PATH = 'data/noise_analysis_results.bin'
+
+
+@dataclass(frozen=True)
+class NoiseSnapshot:
+    """Неизменяемый снимок датасета шума, разложенный по колонкам"""
+    version: Tuple[int, int]  # (mtime_ns, size) файла, из которого построен снимок
+
+    latitude: np.ndarray
+    longitude: np.ndarray
+    noise_ratio: np.ndarray
+    total_complaints: np.ndarray
+    noisy_complaints: np.ndarray
+    is_noisy: np.ndarray
+
+    # Кортежи строк (из JSON) или ленивые колонки поверх таблицы строк (из колоночного файла)
+    addresses: Sequence[str]
+    complaint_frequency: Sequence[str]
+    noise_sources: Sequence[Tuple[str, ...]]
+    last_check_date: Sequence[str]
+
+    # Индексы шумных записей, по ним идет выборка точек
+    noisy_rows: np.ndarray
+    # Пространственный индекс по шумным записям
+    noisy_index: NoiseGridIndex
+    # Пирамида теплокарты шумных записей по уровням зума
+    heatmap: Dict[int, HeatmapLevel]
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    @classmethod
+    def empty(cls) -> 'NoiseSnapshot':
+        return cls.from_records(records=[], version=(0, 0))
+
+    @classmethod
+    def from_records(cls, records: List[dict], version: Tuple[int, int]) -> 'NoiseSnapshot':
+        intern = sys.intern
+
+        return cls._build(
+            version=version,
+            latitude=np.fromiter((record['latitude'] for record in records), dtype=np.float64, count=len(records)),
+            longitude=np.fromiter((record['longitude'] for record in records), dtype=np.float64, count=len(records)),
+            noise_ratio=np.fromiter((record.get('noise_ratio', 0.0) for record in records),
+                                    dtype=np.float64, count=len(records)),
+            total_complaints=np.fromiter((record.get('total_complaints', 0) for record in records),
+                                         dtype=np.int32, count=len(records)),
+            noisy_complaints=np.fromiter((record.get('noisy_complaints', 0) for record in records),
+                                         dtype=np.int32, count=len(records)),
+            is_noisy=np.fromiter((record.get('is_noisy') is True for record in records),
+                                 dtype=np.bool_, count=len(records)),
+            addresses=tuple(record.get('address', '') for record in records),
+            complaint_frequency=tuple(intern(record.get('complaint_frequency', '')) for record in records),
+            noise_sources=tuple(tuple(intern(source) for source in record.get('noise_sources', []))
+                                for record in records),
+            last_check_date=tuple(intern(record.get('last_check_date', '')) for record in records)
+        )
+
+    @classmethod
+    def from_columns(cls, arrays: Dict[str, np.ndarray], version: Tuple[int, int]) -> 'NoiseSnapshot':
+        """Снимок поверх отображенных в память массивов колоночного файла, без копирования колонок"""
+        strings = StringTable(data=arrays['strings'], offsets=arrays['string_offsets'])
+
+        return cls._build(
+            version=version,
+            latitude=arrays['latitude'],
+            longitude=arrays['longitude'],
+            noise_ratio=arrays['noise_ratio'],
+            total_complaints=arrays['total_complaints'],
+            noisy_complaints=arrays['noisy_complaints'],
+            is_noisy=arrays['is_noisy'],
+            addresses=StringColumn(table=strings, ids=arrays['address_ids']),
+            complaint_frequency=StringColumn(table=strings, ids=arrays['complaint_frequency_ids']),
+            noise_sources=StringListColumn(table=strings, ids=arrays['noise_sources_ids'],
+                                           offsets=arrays['noise_sources_offsets']),
+            last_check_date=StringColumn(table=strings, ids=arrays['last_check_date_ids'])
+        )
+
+    @classmethod
+    def _build(cls, version: Tuple[int, int], latitude: np.ndarray, longitude: np.ndarray,
+               noise_ratio: np.ndarray, total_complaints: np.ndarray, is_noisy: np.ndarray,
+               **columns) -> 'NoiseSnapshot':
+        noisy_rows = np.flatnonzero(is_noisy).astype(np.int32)
+
+        return cls(
+            version=version,
+            latitude=latitude,
+            longitude=longitude,
+            noise_ratio=noise_ratio,
+            total_complaints=total_complaints,
+            is_noisy=is_noisy,
+            noisy_rows=noisy_rows,
+            noisy_index=NoiseGridIndex(latitude=latitude, longitude=longitude, rows=noisy_rows),
+            heatmap=build_heatmap_pyramid(latitude=latitude[noisy_rows], longitude=longitude[noisy_rows],
+                                          noise_ratio=noise_ratio[noisy_rows],
+                                          total_complaints=total_complaints[noisy_rows]),
+            **columns
+        )
+
+    def record(self, row: int) -> dict:
+        """Собирает запись в том же виде, в каком она лежит в JSON файле"""
+        return {
+            'latitude': float(self.latitude[row]),
+            'longitude': float(self.longitude[row]),
+            'address': self.addresses[row],
+            'is_noisy': bool(self.is_noisy[row]),
+            'complaint_frequency': self.complaint_frequency[row],
+            'total_complaints': int(self.total_complaints[row]),
+            'noisy_complaints': int(self.noisy_complaints[row]),
+            'noise_sources': list(self.noise_sources[row]),
+            'last_check_date': self.last_check_date[row],
+            'noise_ratio': float(self.noise_ratio[row])
+        }
+
+
+class NoiseDataStore:
+    """Общее на процесс хранилище датасета шума.
+
+    Файл читается один раз, дальше запросы работают с готовым снимком. Если у файла
+    поменялся mtime, снимок перестраивается в отдельном потоке и подменяется целиком,
+    так что конкурентные запросы видят либо старую, либо новую версию данных.
+
+    Если рядом с JSON лежит колоночный файл не старше него, читается колоночный файл.
+    """
+
+    def __init__(self, file_path: str = NOISE_DATA_PATH, columns_path: Optional[str] = NOISE_COLUMNS_PATH,
+                 check_interval: float = 1.0):
+        self.file_path = file_path
+        self.columns_path = columns_path
+        self.check_interval = check_interval
+
+        self._snapshot: Optional[NoiseSnapshot] = None
+        self._checked_at = 0.0
+        self._reload_lock = asyncio.Lock()
+
+    @staticmethod
+    def _stat(path: Optional[str]) -> Optional[os.stat_result]:
+        if not path:
+            return None
+
+        try:
+            return os.stat(path)
+        except FileNotFoundError:
+            return None
+
+    def _source(self) -> Tuple[str, Optional[Tuple[int, int]]]:
+        """Файл, из которого нужно читать датасет, и его версия (mtime_ns, size)"""
+        json_stat = self._stat(self.file_path)
+        columns_stat = self._stat(self.columns_path)
+
+        if columns_stat is not None and (json_stat is None or columns_stat.st_mtime_ns >= json_stat.st_mtime_ns):
+            return self.columns_path, (columns_stat.st_mtime_ns, columns_stat.st_size)
+
+        if json_stat is None:
+            return self.file_path, None
+
+        return self.file_path, (json_stat.st_mtime_ns, json_stat.st_size)
+
+    def _file_version(self) -> Optional[Tuple[int, int]]:
+        return self._source()[1]
+
+    def load(self) -> NoiseSnapshot:
+        """Синхронно читает файл и подменяет снимок. При ошибке оставляет прежний снимок"""
+        path, version = self._source()
+
+        if version is None:
+            logger.warning('Noise dataset %s not found', self.file_path)
+
+            if self._snapshot is None:
+                self._snapshot = NoiseSnapshot.empty()
+
+            return self._snapshot
+
+        try:
+            if path == self.columns_path:
+                _, arrays = load_noise_columns(path)
+                snapshot = NoiseSnapshot.from_columns(arrays=arrays, version=version)
+            else:
+                with open(path, 'r', encoding='utf-8') as file:
+                    records = json.load(file)
+
+                snapshot = NoiseSnapshot.from_records(records=records, version=version)
+
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            logger.error('Could not load noise dataset %s: %s', path, e)
+
+            if self._snapshot is None:
+                self._snapshot = NoiseSnapshot.empty()
+
+            return self._snapshot
+
+        self._snapshot = snapshot
+        logger.info('Noise dataset loaded from %s: %s records, %s noisy', path, len(snapshot), len(snapshot.noisy_rows))
+
+        return snapshot
+
+    async def get_snapshot(self) -> NoiseSnapshot:
+        """Возвращает актуальный снимок, перечитывая файл только при изменении mtime"""
+        snapshot = self._snapshot
+        now = time.monotonic()
+
+        if snapshot is not None and now - self._checked_at < self.check_interval:
+            return snapshot
+
+        self._checked_at = now
+        version = self._file_version()
+
+        if snapshot is not None and (version is None or version == snapshot.version):
+            return snapshot
+
+        async with self._reload_lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                await asyncio.to_thread(self.load)
+
+        return self._snapshot
+
+
+noise_store = NoiseDataStore()
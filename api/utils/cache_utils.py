@@ -1,9 +1,21 @@
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
 from cachetools import TTLCache
 import hashlib
 import json
 
 
+logger = logging.getLogger(__name__)
+
+
 def cache_response(ttl: int = 300):
     cache = TTLCache(maxsize=1000, ttl=ttl)
 
@@ -23,4 +35,263 @@ def cache_response(ttl: int = 300):
 
         return wrapper
 
-    return decorator
\ No newline at end of file
+    return decorator
+
+
+class CoalescingTTLCache:
+    """TTL-кеш с LRU-вытеснением для асинхронных загрузчиков.
+
+    Одновременные промахи по одному ключу объединяются: загрузчик запускается один раз,
+    остальные запросы ждут ту же задачу. Результат None считается неудачей и не кешируется.
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._entries: OrderedDict = OrderedDict()  # ключ -> (время записи, значение)
+        self._pending: Dict[Hashable, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+
+        if entry is None:
+            return None
+
+        stored_at, value = entry
+
+        if time.monotonic() - stored_at >= self.ttl:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def age(self, key: Hashable) -> Optional[float]:
+        """Сколько секунд назад записано значение, None если его нет"""
+        entry = self._entries.get(key)
+
+        return time.monotonic() - entry[0] if entry is not None else None
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = self.get(key)
+
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._pending.get(key)
+
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._pending[key] = task
+        else:
+            self.coalesced += 1
+
+        # shield: отмена одного из ожидающих запросов не отменяет загрузку для остальных
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+
+            if value is not None:
+                self.set(key, value)
+
+            return value
+
+        finally:
+            self._pending.pop(key, None)
+
+
+class PerceptualResultCache:
+    """LRU/TTL-кеш результатов по перцептивному хешу изображения.
+
+    Ключ - контекст запроса (промпт, описание) и 64-битный хеш картинки. Значение находится,
+    если в том же контексте есть хеш на расстоянии Хэмминга не больше threshold. Если задан
+    persist_path, кеш читается из JSON-файла при создании и сохраняется методом save() или
+    в фоне через schedule_save() не чаще раза в save_interval секунд.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 86400, threshold: int = 6,
+                 persist_path: Optional[str] = None, save_interval: float = 30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self.persist_path = persist_path
+        self.save_interval = save_interval
+
+        self._save_task: Optional[asyncio.Task] = None
+        self._last_saved = 0.0
+        self._dirty = False  # есть изменения, не попавшие в снимок для записи
+
+        # Снимки нумеруются: запись из фонового потока не затрет более новый файл из save()
+        self._snapshots = 0
+        self._written = 0
+        self._write_lock = threading.Lock()
+
+        # (контекст, хеш) -> (время записи, значение); время по time.time(), чтобы переживать перезапуск
+        self._entries: OrderedDict = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+        if persist_path:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, context: str, image_hash: int) -> Optional[str]:
+        now = time.time()
+        best_key, best_distance = None, self.threshold + 1
+
+        for key, (stored_at, _) in list(self._entries.items()):
+            if now - stored_at >= self.ttl:
+                del self._entries[key]
+                continue
+
+            if key[0] != context:
+                continue
+
+            distance = (key[1] ^ image_hash).bit_count()
+
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+
+        if best_key is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(best_key)
+
+        return self._entries[best_key][1]
+
+    def set(self, context: str, image_hash: int, value: str):
+        key = (context, image_hash)
+
+        self._entries[key] = (time.time(), value)
+        self._entries.move_to_end(key)
+        self._dirty = True
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def load(self):
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as file:
+                entries = json.load(file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            logger.exception('Could not read result cache from %s', self.persist_path)
+            return
+
+        if not isinstance(entries, list):
+            logger.warning('Result cache file %s has unexpected format, ignored', self.persist_path)
+            return
+
+        now = time.time()
+        skipped = 0
+
+        for entry in entries[-self.maxsize:]:
+            try:
+                context, image_hash, stored_at, value = entry
+
+                if not isinstance(context, str) or not isinstance(value, str):
+                    raise TypeError('context and value must be strings')
+
+                key, stored_at = (context, int(image_hash, 16)), float(stored_at)
+            except (TypeError, ValueError):
+                skipped += 1
+                continue
+
+            if now - stored_at < self.ttl:
+                self._entries[key] = (stored_at, value)
+
+        if skipped:
+            logger.warning('Skipped %s malformed entries of result cache %s', skipped, self.persist_path)
+
+    def snapshot(self) -> Tuple[int, list]:
+        """Номер и копия записей для сохранения. Вызывается из потока event loop, где меняется _entries"""
+        self._dirty = False
+        self._snapshots += 1
+
+        return self._snapshots, [[context, f'{image_hash:016x}', stored_at, value]
+                                 for (context, image_hash), (stored_at, value) in self._entries.items()]
+
+    def save(self):
+        """Атомарно записывает кеш в persist_path (например, при остановке приложения).
+
+        Ошибки записи логируются и не пробрасываются.
+        """
+        if self.persist_path:
+            self.write(*self.snapshot())
+
+    def write(self, number: int, entries: list):
+        """Записывает снимок через уникальный временный файл в той же папке и os.replace.
+
+        Не обращается к _entries, поэтому может выполняться в отдельном потоке. Снимок старше
+        уже записанного пропускается.
+        """
+        with self._write_lock:
+            if number > self._written:
+                self._write_file(entries)
+                self._written = number
+
+    def _write_file(self, entries: list):
+        directory = os.path.dirname(self.persist_path) or '.'
+
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.result_cache.', suffix='.tmp')
+
+            try:
+                with open(fd, 'w', encoding='utf-8') as file:
+                    json.dump(entries, file, ensure_ascii=False)
+
+                os.replace(tmp_path, self.persist_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+        except (OSError, ValueError):
+            logger.exception('Could not save result cache to %s', self.persist_path)
+
+    def schedule_save(self):
+        """Планирует фоновое сохранение. Изменения, пришедшие за save_interval, пишутся одним файлом"""
+        if not self.persist_path or (self._save_task is not None and not self._save_task.done()):
+            return
+
+        self._save_task = asyncio.ensure_future(self._save_later())
+
+    async def _save_later(self):
+        # Записи, добавленные во время записи файла, сохраняются следующим проходом
+        while self._dirty:
+            delay = self._last_saved + self.save_interval - time.monotonic()
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            try:
+                await asyncio.to_thread(self.write, *self.snapshot())
+            finally:
+                self._last_saved = time.monotonic()
@@ -0,0 +1,58 @@
+from typing import Optional
+
+import aiohttp
+import httpx
+
+from settings import config_parameters
+
+
+_weather_client: Optional[httpx.AsyncClient] = None
+_llm_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_weather_client() -> httpx.AsyncClient:
+    """Общий на процесс клиент Visual Crossing с пулом keep-alive соединений"""
+    global _weather_client
+
+    if _weather_client is None or _weather_client.is_closed:
+        _weather_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                connect=config_parameters.WEATHER_CONNECT_TIMEOUT,
+                read=config_parameters.WEATHER_READ_TIMEOUT,
+                write=config_parameters.WEATHER_CONNECT_TIMEOUT,
+                pool=config_parameters.WEATHER_CONNECT_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=config_parameters.WEATHER_MAX_CONNECTIONS,
+                max_keepalive_connections=config_parameters.WEATHER_MAX_CONNECTIONS,
+                keepalive_expiry=60.0
+            )
+        )
+
+    return _weather_client
+
+
+def get_llm_session() -> aiohttp.ClientSession:
+    """Общая на процесс сессия OpenRouter, соединения переиспользуются между запросами"""
+    global _llm_session
+
+    if _llm_session is None or _llm_session.closed:
+        _llm_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=config_parameters.LLM_MAX_CONNECTIONS, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=config_parameters.LLM_TIMEOUT)
+        )
+
+    return _llm_session
+
+
+async def close_http_clients():
+    """Закрывает общие клиенты, вызывается при остановке приложения"""
+    global _weather_client, _llm_session
+
+    if _weather_client is not None:
+        await _weather_client.aclose()
+        _weather_client = None
+
+    if _llm_session is not None:
+        await _llm_session.close()
+        _llm_session = None
@@ -0,0 +1,51 @@
+import io
+import logging
+
+from typing import Optional
+
+import numpy as np
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+logger = logging.getLogger(__name__)
+
+
+def prepare_llm_image(contents: bytes, max_edge: int, quality: int) -> bytes:
+    """Уменьшает фото до max_edge по длинной стороне и пережимает в JPEG без EXIF.
+
+    Поворот из EXIF применяется к пикселям до удаления метаданных. Если файл не
+    удалось открыть как изображение, возвращается без изменений.
+    """
+    try:
+        with Image.open(io.BytesIO(contents)) as image:
+            image.draft('RGB', (max_edge, max_edge))  # JPEG декодируется сразу в уменьшенном масштабе
+            image = ImageOps.exif_transpose(image)
+
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+
+            image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+            output = io.BytesIO()
+            image.save(output, format='JPEG', quality=quality, optimize=True)
+
+    except (UnidentifiedImageError, OSError) as e:
+        logger.warning('Could not preprocess image, sending it as is: %s', e)
+        return contents
+
+    return output.getvalue()
+
+
+def image_dhash(contents: bytes) -> Optional[int]:
+    """64-битный разностный хеш (dHash): у похожих снимков отличается в нескольких битах"""
+    try:
+        with Image.open(io.BytesIO(contents)) as image:
+            image.draft('L', (64, 64))
+            pixels = np.asarray(image.convert('L').resize((9, 8), Image.Resampling.LANCZOS), dtype=np.int16)
+
+    except (UnidentifiedImageError, OSError):
+        return None
+
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
@@ -0,0 +1,30 @@
+class LatencyStats:
+    """Простая статистика по длительностям (в секундах) для отдачи в эндпоинтах метрик"""
+
+    __slots__ = ('count', 'total', 'max', 'last')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+    def as_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 2),
+            'last_ms': round(self.last * 1000, 2)
+        }
+
+
+def hit_rate(hits: int, misses: int) -> float:
+    total = hits + misses
+
+    return round(hits / total, 4) if total else 0.0
@@ -0,0 +1,126 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+
+
+GEOMETRY_TYPES = ('POINT', 'LINESTRING', 'POLYGON', 'MULTIPOINT', 'MULTILINESTRING', 'MULTIPOLYGON')
+# Глубина скобок, на которой лежат полигоны (кольца - на одну глубже)
+POLYGON_DEPTH = {'POLYGON': 1, 'MULTIPOLYGON': 2}
+
+_HEADER = re.compile(r'\s*(?:SRID=\d+;)?\s*([A-Za-z]+)\s*(ZM|Z|M)?\s*', re.IGNORECASE)
+_SEPARATORS = str.maketrans('(),', '   ')
+
+
+@dataclass(frozen=True)
+class WktGeometry:
+    """Геометрия из WKT: все точки одним массивом и границы колец.
+
+    coords - массив (n, 2) пар (lon, lat) всех точек подряд, Z и M отбрасываются.
+    ring_offsets - начало каждого кольца (линии, точки MULTIPOINT) в coords, последний элемент - n.
+    polygon_offsets - для POLYGON/MULTIPOLYGON начало каждого полигона в списке колец,
+    последний элемент - число колец; для остальных типов пустой.
+    """
+    geom_type: str
+    coords: np.ndarray
+    ring_offsets: np.ndarray
+    polygon_offsets: np.ndarray
+
+    def rings(self) -> List[np.ndarray]:
+        return [self.coords[start:end] for start, end in zip(self.ring_offsets[:-1], self.ring_offsets[1:])]
+
+    def polygons(self) -> List[List[np.ndarray]]:
+        rings = self.rings()
+
+        return [rings[start:end] for start, end in zip(self.polygon_offsets[:-1], self.polygon_offsets[1:])]
+
+    def to_latlon_list(self) -> List[Dict[str, float]]:
+        """Все точки подряд в формате поля Event.geom: [{'lat': ..., 'lon': ...}, ...]"""
+        return [{'lat': lat, 'lon': lon} for lon, lat in self.coords.tolist()]
+
+
+def parse_wkt(wkt: str) -> WktGeometry:
+    """Разбирает WKT (POINT, LINESTRING, POLYGON и их MULTI-варианты, в том числе с Z/M и SRID=...;).
+
+    Скобки проходятся один раз, чтобы получить границы колец, а все числа разбираются
+    одним np.fromiter по токенам строки. Для некорректной строки бросает ValueError.
+    """
+    header = _HEADER.match(wkt)
+    geom_type = header.group(1).upper() if header else None
+
+    if geom_type not in GEOMETRY_TYPES:
+        raise ValueError(f'Unsupported WKT geometry: {wkt[:40]!r}')
+
+    polygon_depth = POLYGON_DEPTH.get(geom_type)
+    body = wkt[header.end():].rstrip()
+
+    ring_points: List[int] = []
+    polygon_ends: List[int] = []
+
+    if body.upper() != 'EMPTY':
+        if not body.startswith('(') or not body.endswith(')'):
+            raise ValueError(f'Malformed WKT: {wkt[:40]!r}')
+
+        depth = 0
+        opened_at = 0
+        innermost = False
+        # Скобки ищутся через str.find: их немного, а между ними тысячи символов координат
+        next_open = body.find('(')
+        next_close = body.find(')')
+
+        while next_close != -1:
+            if next_open != -1 and next_open < next_close:
+                depth += 1
+                opened_at = next_open + 1
+                innermost = True
+                next_open = body.find('(', opened_at)
+                continue
+
+            if innermost:
+                # Точки кольца разделены запятыми, координаты точки - пробелами
+                ring_points.append(body.count(',', opened_at, next_close) + 1)
+                innermost = False
+
+            if depth == polygon_depth:
+                polygon_ends.append(len(ring_points))
+
+            depth -= 1
+            if depth == 0:
+                break
+
+            next_close = body.find(')', next_close + 1)
+
+        # Внешняя скобка должна закрываться последним символом строки
+        if depth != 0 or next_close != len(body) - 1:
+            raise ValueError(f'Unbalanced parentheses in WKT: {wkt[:40]!r}')
+
+    points = sum(ring_points)
+
+    # Скобки и запятые заменяются пробелами, и все числа разбираются одним проходом по токенам
+    try:
+        values = np.fromiter(map(float, body.translate(_SEPARATORS).split()), dtype=np.float64) if points \
+            else np.empty(0)
+    except ValueError:
+        raise ValueError(f'Non-numeric coordinates in WKT: {wkt[:40]!r}') from None
+
+    tag = (header.group(2) or '').upper()
+    dims = 2 + len(tag) if tag else (values.size // points if points else 2)
+
+    if dims < 2 or values.size != dims * points:
+        raise ValueError(f'Inconsistent coordinates in WKT: {wkt[:40]!r}')
+
+    ring_offsets = np.zeros(len(ring_points) + 1, dtype=np.int64)
+    np.cumsum(ring_points, out=ring_offsets[1:])
+
+    if polygon_depth is not None:
+        polygon_offsets = np.array([0, *polygon_ends], dtype=np.int64)
+    else:
+        polygon_offsets = np.empty(0, dtype=np.int64)
+
+    coords = values.reshape(points, dims)
+    if dims > 2:
+        coords = np.ascontiguousarray(coords[:, :2])
+
+    return WktGeometry(geom_type=geom_type, coords=coords, ring_offsets=ring_offsets,
+                       polygon_offsets=polygon_offsets)
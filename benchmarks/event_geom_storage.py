@@ -0,0 +1,72 @@
+"""Размер Event.geom в строке таблицы и время его обработки: JSON против упакованных float64.
+
+Для геометрий разного размера сравниваются:
+- json: прежняя колонка JSON (json.dumps при записи, json.loads при чтении);
+- packed: PackedLatLon (пары lat, lon в float64, np.frombuffer при чтении).
+
+Время чтения считается для списка из --events событий, как в /events/list.
+Размер - байты значения в строке без служебных заголовков Postgres.
+
+Запуск из корня репозитория (нужны те же переменные окружения, что и для API):
+    python benchmarks/event_geom_storage.py --points 5 100 1000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.gis_models import PackedLatLon
+
+
+def generate_geom(points: int, seed: int = 1):
+    rnd = random.Random(seed)
+
+    return [{'lat': round(55.5 + rnd.random() * 0.4, 7), 'lon': round(37.3 + rnd.random() * 0.6, 7)}
+            for _ in range(points)]
+
+
+def best_of(func, repeat: int = 5) -> float:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, nargs='+', default=[5, 100, 1000])
+    parser.add_argument('--events', type=int, default=100)
+    args = parser.parse_args()
+
+    packed_type = PackedLatLon()
+
+    print(f'{"points":>7} {"format":>7} {"bytes":>8} {"write, us":>10} {"read list, ms":>14}')
+
+    for points in args.points:
+        geoms = [generate_geom(points, seed=seed) for seed in range(args.events)]
+
+        json_rows = [json.dumps(geom) for geom in geoms]
+        packed_rows = [packed_type.process_bind_param(geom, None) for geom in geoms]
+
+        assert [packed_type.process_result_value(row, None) for row in packed_rows] == geoms
+
+        formats = {
+            'json': (json_rows, json.dumps, json.loads),
+            'packed': (packed_rows, lambda geom: packed_type.process_bind_param(geom, None),
+                       lambda row: packed_type.process_result_value(row, None)),
+        }
+
+        for name, (rows, encode, decode) in formats.items():
+            size = sum(len(row.encode('utf-8') if isinstance(row, str) else row) for row in rows) // len(rows)
+            write = best_of(lambda: encode(geoms[0]))
+            read = best_of(lambda: [decode(row) for row in rows])
+
+            print(f'{points:>7} {name:>7} {size:>8} {write * 1e6:>10.1f} {read * 1e3:>14.2f}')
+
+
+if __name__ == '__main__':
+    main()
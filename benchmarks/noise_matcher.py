@@ -0,0 +1,163 @@
+"""Микробенчмарк разбора текста результатов обращения: шумность и источники шума.
+
+Сравниваются:
+- before: прежняя пара analyze_noise_result + extract_noise_sources (два lower(), re.sub для категории);
+- regex: одна регулярка с альтернативой всех фраз в lookahead (находит пересекающиеся фразы);
+- automaton: автомат Ахо-Корасик на чистом Python, один проход по символам текста
+  (пересекающиеся фразы вроде "кафе" / "летнее кафе" находятся вместе);
+- matcher: NoiseAnalysisService.classify_complaint (один lower(), затем проверка `in` для каждой фразы).
+
+Перед замером проверяется, что automaton находит те же фразы, что и проверки `in`.
+
+Запуск из корня репозитория (нужны те же переменные окружения, что и для API):
+    python benchmarks/noise_matcher.py
+"""
+import os
+import re
+import sys
+import timeit
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from noise_parser import NoiseAnalysisService
+
+
+SAMPLES = [
+    ('[Вентиляционные системы]', 'По результатам лабораторных исследований, проведенных в ночное время, '
+                                 'превышения нормативов уровня шума от работы вентиляционные системы '
+                                 'ресторана выявлены. Материалы переданы в управление.'),
+    ('None', 'Инструментальные замеры не производились в связи с отсутствием доступа в квартиру заявителя.'),
+    ('[Автотранспорт]', 'Превышения не выявлены, источник шума - автотранспорт на Садовом кольце.'),
+    ('', 'Проведены замеры шума от летнее кафе и музыка в ночное время.'),
+]
+
+
+def analyze_noise_result_before(service: NoiseAnalysisService, results_text: str) -> bool:
+    if not results_text:
+        return False
+
+    results_lower = results_text.lower()
+
+    for phrase, is_noisy in service.noise_keywords.items():
+        if phrase in results_lower:
+            return is_noisy
+
+    return True
+
+
+def extract_noise_sources_before(noise_category: str, results_text: str):
+    sources = []
+
+    if noise_category and noise_category != "None" and noise_category != "null":
+        category_clean = re.sub(r'[\[\]]', '', noise_category)
+        if category_clean and category_clean != "None":
+            sources.append(category_clean)
+
+    if results_text:
+        results_lower = results_text.lower()
+        common_sources = [
+            'автотранспорт', 'строительные работы', 'вентиляционные системы',
+            'генераторная установка', 'промышленное предприятие', 'железнодорожный транспорт',
+            'дорожно-ремонтные работы', 'погрузочно-разгрузочные работы', 'летнее кафе',
+            'автомойка', 'музыка', 'кафе', 'ресторан', 'клуб'
+        ]
+
+        for source in common_sources:
+            if source in results_lower:
+                sources.append(source)
+
+    return list(set(sources))
+
+
+def before(service: NoiseAnalysisService, noise_category: str, results_text: str):
+    return (analyze_noise_result_before(service, results_text),
+            extract_noise_sources_before(noise_category, results_text))
+
+
+class AhoCorasick:
+    """Автомат Ахо-Корасик: номера всех фраз, входящих в текст, за один проход по символам"""
+
+    def __init__(self, phrases):
+        self.goto = [{}]
+        self.outputs = [()]
+
+        for index, phrase in enumerate(phrases):
+            state = 0
+
+            for char in phrase:
+                if char not in self.goto[state]:
+                    self.goto[state][char] = len(self.goto)
+                    self.goto.append({})
+                    self.outputs.append(())
+
+                state = self.goto[state][char]
+
+            self.outputs[state] += (index,)
+
+        # Ссылки неудач строятся обходом в ширину, выходы наследуются по ним
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+
+            for char, target in self.goto[state].items():
+                queue.append(target)
+                fallback = self.fail[state]
+
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+
+                self.fail[target] = self.goto[fallback].get(char, 0) if state else 0
+                self.outputs[target] += self.outputs[self.fail[target]]
+
+    def find(self, text: str) -> set:
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        state, found = 0, set()
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+
+            state = goto[state].get(char, 0)
+
+            if outputs[state]:
+                found.update(outputs[state])
+
+        return found
+
+
+def main():
+    service = NoiseAnalysisService(geocoder=None)
+
+    phrases = sorted({*service.noise_keywords, *service.common_sources}, key=len, reverse=True)
+    pattern = re.compile(f'(?=({"|".join(map(re.escape, phrases))}))', re.IGNORECASE)
+    automaton = AhoCorasick(phrases)
+
+    for _, text in SAMPLES:
+        text = text.lower()
+        assert automaton.find(text) == {index for index, phrase in enumerate(phrases) if phrase in text}
+
+    candidates = {
+        'before': lambda category, text: before(service, category, text),
+        'regex': lambda category, text: [match.group(1) for match in pattern.finditer(text)],
+        'automaton': lambda category, text: automaton.find(text.lower()),
+        'matcher': service.classify_complaint,
+    }
+
+    number = 5000
+    best = dict.fromkeys(candidates, float('inf'))
+
+    # Кандидаты чередуются, берется лучший из повторов - так меньше влияет фоновая нагрузка
+    for _ in range(20):
+        for name, function in candidates.items():
+            seconds = timeit.timeit(lambda: [function(category, text) for category, text in SAMPLES], number=number)
+            best[name] = min(best[name], seconds / (number * len(SAMPLES)))
+
+    for name, seconds in best.items():
+        print(f'{name:>9}: {seconds * 1e6:.2f} us per complaint')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Пиковое потребление памяти (RSS) парсером шумовых обращений в зависимости от размера CSV.
+
+Для каждого размера генерируется синтетический CSV в формате открытых данных, затем в отдельном
+процессе выполняется чтение и группировка по адресам двумя способами:
+- stream: построчное чтение и группировка по мере чтения (aggregate_complaints(iter_csv_records));
+- materialize: сначала весь список записей (parse_csv_file), затем группировка, как было раньше.
+
+Запуск из корня репозитория (нужны те же переменные окружения, что и для API):
+    python benchmarks/noise_parser_memory.py --rows 50000 200000 800000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+RESULTS = ['Превышения нормативов выявлены, источник шума - автотранспорт', 'Превышения не выявлены',
+           'Замеры не производились', 'Шум от музыки в кафе', '']
+CATEGORIES = ['[Автотранспорт]', 'None', '[Строительные работы]', '[Вентиляционные системы]']
+
+
+def generate_csv(path: str, rows: int, seed: int = 1):
+    rnd = random.Random(seed)
+    addresses = max(rows // 5, 1)
+
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('"ID";"Date";"Location";"District";"AdmArea";"NoiseCategory";"Results";'
+                   '"Longitude_WGS84";"Latitude_WGS84"\n')
+        file.write('"Код";"Дата";"Адрес";"Район";"Округ";"Категория";"Результат";"Долгота";"Широта"\n')
+
+        for row in range(rows):
+            file.write(f'"{row}";"2023-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}";'
+                       f'"г. Москва, ул. Тестовая, д. {rnd.randrange(addresses)}";"Район";"Округ";'
+                       f'"{rnd.choice(CATEGORIES)}";"{rnd.choice(RESULTS)}";'
+                       f'"{37.3 + rnd.random() * 0.6:.6f}";"{55.5 + rnd.random() * 0.4:.6f}"\n')
+
+
+def run_child(path: str, mode: str):
+    from noise_parser import NoiseAnalysisService
+
+    service = NoiseAnalysisService(geocoder=None)
+    started_at = time.perf_counter()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == 'stream':
+            aggregates = service.aggregate_complaints(service.iter_csv_records(path))
+        else:
+            aggregates = service.aggregate_complaints(service.parse_csv_file(path))
+
+    elapsed = time.perf_counter() - started_at
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(f'{len(aggregates)} {elapsed:.2f} {peak_rss_mb:.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[50000, 200000, 800000])
+    parser.add_argument('--child', nargs=2, metavar=('CSV', 'MODE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    print(f'{"rows":>9} {"csv, MB":>8} {"mode":>12} {"addresses":>10} {"time, s":>8} {"peak RSS, MB":>13}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            path = os.path.join(directory, f'noise_{rows}.csv')
+            generate_csv(path, rows)
+            size_mb = os.path.getsize(path) / 1024 / 1024
+
+            for mode in ('stream', 'materialize'):
+                output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', path, mode],
+                                        check=True, capture_output=True, text=True).stdout
+                addresses, elapsed, peak_rss = output.split()
+
+                print(f'{rows:>9} {size_mb:>8.1f} {mode:>12} {addresses:>10} {elapsed:>8} {peak_rss:>13}')
+
+
+if __name__ == '__main__':
+    main()
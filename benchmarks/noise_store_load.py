@@ -0,0 +1,110 @@
+"""Время загрузки датасета шума в API и прирост памяти (RSS): JSON против колоночного файла.
+
+Для каждого размера генерируются синтетические результаты анализа и сохраняются так же, как их
+сохраняет noise_parser.py: JSON с indent=2 и колоночная бинарная копия. Затем в отдельном процессе
+выполняется NoiseDataStore.load() из одного из источников:
+- json: json.load и сборка колонок из списка словарей;
+- columns: np.memmap файла, колонки и таблица строк используются без копирования.
+
+RSS считается после импорта модулей, поэтому в прирост входят только данные и индексы снимка.
+
+Запуск из корня репозитория (нужны те же переменные окружения, что и для API):
+    python benchmarks/noise_store_load.py --records 9000 100000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+SOURCES = ['автотранспорт', 'вентиляционные системы', 'строительные работы', 'музыка', 'кафе', 'соседи']
+FREQUENCIES = ['низкая', 'средняя', 'высокая']
+
+
+def generate_records(count: int, seed: int = 1):
+    rnd = random.Random(seed)
+
+    for row in range(count):
+        total = rnd.randint(1, 40)
+        noisy = rnd.randint(0, total)
+
+        yield {
+            'latitude': 55.5 + rnd.random() * 0.4,
+            'longitude': 37.3 + rnd.random() * 0.6,
+            'address': f'г. Москва, ул. Тестовая, д. {row}',
+            'is_noisy': noisy / total > 0.5,
+            'complaint_frequency': rnd.choice(FREQUENCIES),
+            'total_complaints': total,
+            'noisy_complaints': noisy,
+            'noise_sources': sorted(rnd.sample(SOURCES, rnd.randint(0, 3))),
+            'last_check_date': f'2023-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}',
+            'noise_ratio': round(noisy / total, 2)
+        }
+
+
+def current_rss_mb() -> float:
+    with open('/proc/self/statm') as file:
+        return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+
+
+def run_child(json_path: str, columns_path: str, source: str):
+    from api.services.internal.noise_store import NoiseDataStore
+
+    store = NoiseDataStore(file_path=json_path, columns_path=columns_path if source == 'columns' else None)
+    rss_before = current_rss_mb()
+    started_at = time.perf_counter()
+
+    snapshot = store.load()
+
+    elapsed = time.perf_counter() - started_at
+    # Обращение ко всем записям, чтобы в RSS попали и отображенные страницы колоночного файла
+    for row in range(len(snapshot)):
+        snapshot.record(row)
+
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(f'{len(snapshot)} {elapsed * 1000:.1f} {current_rss_mb() - rss_before:.1f} {peak_rss_mb:.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, nargs='+', default=[9000, 100000])
+    parser.add_argument('--child', nargs=3, metavar=('JSON', 'COLUMNS', 'SOURCE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    from noise_parser import NoiseAnalysisService
+
+    print(f'{"records":>8} {"source":>8} {"file, MB":>9} {"load, ms":>9} {"RSS +, MB":>10} {"peak RSS, MB":>13}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        for count in args.records:
+            json_path = os.path.join(directory, f'noise_{count}.json')
+            columns_path = os.path.join(directory, f'noise_{count}.bin')
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                NoiseAnalysisService.write_json_records(generate_records(count), json_path, columns_path)
+
+            for source, path in (('json', json_path), ('columns', columns_path)):
+                size_mb = os.path.getsize(path) / 1024 / 1024
+                output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child',
+                                         json_path, columns_path, source],
+                                        check=True, capture_output=True, text=True).stdout
+                _, elapsed, rss_delta, peak_rss = output.split()
+
+                print(f'{count:>8} {source:>8} {size_mb:>9.1f} {elapsed:>9} {rss_delta:>10} {peak_rss:>13}')
+
+
+if __name__ == '__main__':
+    main()
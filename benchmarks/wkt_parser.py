@@ -0,0 +1,82 @@
+"""Микробенчмарк разбора WKT-геометрии событий при импорте.
+
+Сравниваются:
+- before: прежний EventsCsvImporter._parse_wkt_to_latlon_list (два re.findall на пару координат);
+- parse_wkt: api.utils.wkt_parser.parse_wkt (один проход по скобкам, числа одним np.fromiter);
+- latlon_list: parse_wkt(...).to_latlon_list(), то, что теперь кладется в payload импорта.
+
+Перед замером проверяется, что новый разбор дает те же точки, что и прежний.
+
+Запуск из корня репозитория:
+    python benchmarks/wkt_parser.py --vertices 10 1000 5000
+"""
+import argparse
+import math
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.utils.wkt_parser import parse_wkt
+
+
+def parse_before(wkt):
+    points = []
+    coord_pattern = r"[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?"
+    coord_pairs = re.findall(rf"({coord_pattern}\s+{coord_pattern})", wkt)
+
+    for pair in coord_pairs:
+        coords = re.findall(coord_pattern, pair)
+        if len(coords) >= 2:
+            points.append({"lat": float(coords[1]), "lon": float(coords[0])})
+
+    return points or None
+
+
+def generate_polygon(vertices: int, seed: int = 1) -> str:
+    """Полигон с внешним кольцом из vertices точек и дыркой в 10 раз меньше"""
+    rnd = random.Random(seed)
+
+    def ring(count: int, radius: float) -> str:
+        points = [(37.6 + radius * math.cos(2 * math.pi * i / count) + rnd.uniform(-1e-5, 1e-5),
+                   55.75 + radius * math.sin(2 * math.pi * i / count) + rnd.uniform(-1e-5, 1e-5))
+                  for i in range(count)]
+        points.append(points[0])
+
+        return '(' + ', '.join(f'{lon:.7f} {lat:.7f}' for lon, lat in points) + ')'
+
+    return f'POLYGON ({ring(vertices, 0.01)}, {ring(max(vertices // 10, 3), 0.001)})'
+
+
+def best_of(func, repeat: int = 7) -> float:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vertices', type=int, nargs='+', default=[10, 1000, 5000])
+    args = parser.parse_args()
+
+    print(f'{"vertices":>9} {"before, us":>11} {"parse_wkt, us":>14} {"latlon_list, us":>16} {"speedup":>8}')
+
+    for vertices in args.vertices:
+        wkt = generate_polygon(vertices)
+
+        assert parse_wkt(wkt).to_latlon_list() == parse_before(wkt)
+
+        before = best_of(lambda: parse_before(wkt))
+        parsed = best_of(lambda: parse_wkt(wkt))
+        latlon_list = best_of(lambda: parse_wkt(wkt).to_latlon_list())
+
+        print(f'{vertices:>9} {before * 1e6:>11.1f} {parsed * 1e6:>14.1f} {latlon_list * 1e6:>16.1f} '
+              f'{before / latlon_list:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
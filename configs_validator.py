@@ -34,10 +34,42 @@ class APIConfigsModel(BaseModel):
 class LLMConfigsModel(BaseModel):
     OPENROUTER_API_KEY: Union[str]
 
+    LLM_MAX_CONCURRENCY: Union[int] = 4  # одновременных запросов к OpenRouter на воркер
+    LLM_MAX_CONNECTIONS: Union[int] = 8
+    LLM_TIMEOUT: Union[float] = 60.0
+    LLM_IMAGE_MAX_EDGE: Union[int] = 1024  # длинная сторона фото перед отправкой в LLM, пиксели
+    LLM_IMAGE_JPEG_QUALITY: Union[int] = 80
+
+    LLM_CACHE_MAXSIZE: Union[int] = 512
+    LLM_CACHE_TTL: Union[int] = 86400
+    LLM_CACHE_HAMMING_THRESHOLD: Union[int] = 6  # из 64 бит dHash
+    LLM_CACHE_PATH: Union[str, None] = None  # JSON-файл для сохранения кеша между перезапусками
+    LLM_CACHE_SAVE_INTERVAL: Union[int] = 30  # не чаще раза в столько секунд
+
+    LLM_JOB_WORKERS: Union[int] = 4
+    LLM_JOB_QUEUE_SIZE: Union[int] = 100  # при заполненной очереди новые задачи получают 429
+    LLM_JOB_TTL: Union[int] = 600  # сколько хранится результат задачи, секунды
+    LLM_JOB_REDIS_URL: Union[str, None] = None  # если задан, состояние задач хранится в Redis
+
 
 class WeatherConfigsModel(BaseModel):
     VISUAL_CROSSING_API_KEY: Union[str]
 
+    WEATHER_CONNECT_TIMEOUT: Union[float] = 3.0
+    WEATHER_READ_TIMEOUT: Union[float] = 10.0
+    WEATHER_MAX_CONNECTIONS: Union[int] = 20
+
+    WEATHER_TILE_SIZE: Union[float] = 0.05  # сторона тайла кеша погоды в градусах
+    WEATHER_CACHE_TTL: Union[int] = 1800
+    WEATHER_CACHE_MAXSIZE: Union[int] = 4096
+    WEATHER_BATCH_CONCURRENCY: Union[int] = 8
+
+    WEATHER_PREFETCH_ENABLED: Union[bool] = True
+    WEATHER_PREFETCH_HOT_TILES: Union[int] = 50
+    WEATHER_PREFETCH_MARGIN: Union[int] = 300  # обновлять тайл за столько секунд до истечения TTL
+    WEATHER_PREFETCH_BUDGET: Union[int] = 30  # запросов к Visual Crossing в минуту
+    WEATHER_PREFETCH_INTERVAL: Union[int] = 30
+
 
 class GisConfigsModel(BaseModel):
     GIS_API_KEY: Union[str]
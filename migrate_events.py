@@ -0,0 +1,157 @@
+"""
+Разовое обновление таблицы events под текущую модель Event: uuid строки импорта, упакованная geom и bbox.
+
+Шаги, каждый можно безопасно повторить:
+1. добавляется колонка uuid; события с повторяющимся uuid удаляются (остается последнее по id),
+   затем создается ограничение уникальности events_uuid_key, нужное для ON CONFLICT (uuid);
+2. добавляются колонки min_lat, min_lon, max_lat, max_lon и индекс ix_events_bbox;
+3. если geom еще не bytea, точки пачками переупаковываются во временную колонку geom_packed
+   вместе с bbox, затем в одной транзакции старая колонка удаляется, а geom_packed переименовывается;
+4. если geom уже bytea, заполняется bbox у событий, где его нет.
+
+Порядок выкладки: остановить API, запустить скрипт, запустить новую версию. Без шагов 1-3 новый код
+не может вставлять события, а alembic revision --autogenerate для этих колонок до скрипта не запускать:
+он сгенерирует перевод geom в bytea без USING, который не выполнится на заполненной таблице.
+    python migrate_events.py --batch-size 1000
+"""
+import argparse
+import asyncio
+import json
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from api.database import DATABASE_URL
+from models.gis_models import Event, PackedLatLon
+
+
+log = logging.getLogger("migrate_events")
+
+BBOX_COLUMNS = ("min_lat", "min_lon", "max_lat", "max_lon")
+
+
+async def geom_column_type(connection: AsyncConnection) -> str:
+    result = await connection.execute(text(
+        "SELECT data_type FROM information_schema.columns WHERE table_name = 'events' AND column_name = 'geom'"
+    ))
+
+    return result.scalar_one()
+
+
+async def add_uuid_column(connection: AsyncConnection) -> None:
+    await connection.execute(text("ALTER TABLE events ADD COLUMN IF NOT EXISTS uuid VARCHAR"))
+
+    result = await connection.execute(text(
+        "DELETE FROM events a USING events b WHERE a.uuid = b.uuid AND a.id < b.id"
+    ))
+    if result.rowcount:
+        log.warning("Удалено событий с повторяющимся uuid: %s", result.rowcount)
+
+    constraint = await connection.execute(text(
+        "SELECT 1 FROM pg_constraint WHERE conname = 'events_uuid_key'"
+    ))
+    if constraint.scalar() is None:
+        await connection.execute(text("ALTER TABLE events ADD CONSTRAINT events_uuid_key UNIQUE (uuid)"))
+
+
+async def add_bbox_columns(connection: AsyncConnection) -> None:
+    for column in BBOX_COLUMNS:
+        await connection.execute(text(f"ALTER TABLE events ADD COLUMN IF NOT EXISTS {column} DOUBLE PRECISION"))
+
+    await connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_events_bbox ON events (min_lat, max_lat, min_lon, max_lon)"
+    ))
+
+
+async def convert_batches(connection: AsyncConnection, *, select_sql: str, update_sql: str, batch_size: int,
+                          decode) -> int:
+    """
+    Читает события пачками по возрастанию id, упаковывает geom и считает bbox. Возвращает число событий.
+    """
+    packed_type = PackedLatLon()
+    last_id, converted = 0, 0
+
+    while True:
+        rows = (await connection.execute(text(select_sql), {"last_id": last_id, "limit": batch_size})).all()
+        if not rows:
+            return converted
+
+        params = []
+        for event_id, value in rows:
+            geom = decode(value)
+            params.append({"id": event_id, "geom": packed_type.process_bind_param(geom, None),
+                           **Event.bbox_columns(geom)})
+
+        await connection.execute(text(update_sql), params)
+        await connection.commit()
+
+        last_id = rows[-1][0]
+        converted += len(rows)
+        log.info("Обработано событий: %s (последний id %s)", converted, last_id)
+
+
+async def migrate(batch_size: int) -> None:
+    engine = create_async_engine(DATABASE_URL)
+    bbox_set = ", ".join(f"{column} = :{column}" for column in BBOX_COLUMNS)
+
+    try:
+        async with engine.connect() as connection:
+            await add_uuid_column(connection)
+            await connection.commit()
+
+            await add_bbox_columns(connection)
+            await connection.commit()
+
+            column_type = await geom_column_type(connection)
+
+            if column_type != "bytea":
+                log.info("events.geom имеет тип %s, перевод в bytea", column_type)
+
+                await connection.execute(text("ALTER TABLE events ADD COLUMN IF NOT EXISTS geom_packed BYTEA"))
+                await connection.commit()
+
+                converted = await convert_batches(
+                    connection,
+                    select_sql="SELECT id, geom::text FROM events "
+                               "WHERE id > :last_id AND geom IS NOT NULL AND geom_packed IS NULL "
+                               "ORDER BY id LIMIT :limit",
+                    update_sql=f"UPDATE events SET geom_packed = :geom, {bbox_set} WHERE id = :id",
+                    batch_size=batch_size,
+                    decode=json.loads,
+                )
+
+                await connection.execute(text("ALTER TABLE events DROP COLUMN geom"))
+                await connection.execute(text("ALTER TABLE events RENAME COLUMN geom_packed TO geom"))
+                await connection.commit()
+
+            else:
+                # Колонка уже bytea: заполняется bbox, JSON внутри bytea тоже переупаковывается
+                packed_type = PackedLatLon()
+                converted = await convert_batches(
+                    connection,
+                    select_sql="SELECT id, geom FROM events "
+                               "WHERE id > :last_id AND geom IS NOT NULL AND min_lat IS NULL "
+                               "ORDER BY id LIMIT :limit",
+                    update_sql=f"UPDATE events SET geom = :geom, {bbox_set} WHERE id = :id",
+                    batch_size=batch_size,
+                    decode=lambda value: packed_type.process_result_value(value, None),
+                )
+
+            log.info("Готово, обработано событий: %s", converted)
+
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+
+    arg_parser = argparse.ArgumentParser(description="Обновление таблицы events: uuid, PackedLatLon geom и bbox")
+    arg_parser.add_argument("--batch-size", type=int, default=1000, help="Сколько событий обновлять за транзакцию")
+    args = arg_parser.parse_args()
+
+    asyncio.run(migrate(args.batch_size))
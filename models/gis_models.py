@@ -1,11 +1,50 @@
 import datetime
+import json
 
 from typing import Optional, List, Dict, Any, Set
 
+import numpy as np
+
 from api.database import Base
-from sqlalchemy.orm import Mapped, relationship, mapped_column
+from sqlalchemy.orm import Mapped, relationship, mapped_column, validates
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy import (Column, Integer, String, DateTime,
-                        ForeignKey, Text, Float, JSON)
+                        ForeignKey, Text, Float, LargeBinary, Index)
+
+
+class PackedLatLon(TypeDecorator):
+    """Список точек [{'lat': .., 'lon': ..}, ...], хранящийся в БД упакованными float64.
+
+    Точки лежат подряд парами (lat, lon) little-endian, 16 байт на точку вместо JSON-текста.
+    При чтении значение собирается обратно в тот же список словарей, так что ответы API не меняются.
+    Значения в прежнем JSON-формате, еще не переведенные migrate_events.py, читаются как JSON.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+
+        return np.array([(point['lat'], point['lon']) for point in value], dtype='<f8').tobytes()
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+
+        if isinstance(value, list):
+            return value
+
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+
+        if value[:1] == b'[' and value[-1:] == b']':
+            try:
+                return json.loads(value)
+            except ValueError:
+                pass  # упакованные float64, случайно начавшиеся с '['
+
+        return [{'lat': lat, 'lon': lon} for lat, lon in np.frombuffer(value, dtype='<f8').reshape(-1, 2).tolist()]
 
 
 class BaseModel(Base):
@@ -182,6 +221,11 @@ class Event(BaseModel):
 
     id: Mapped[int] = Column(Integer, primary_key=True)
 
+    # Внешний ключ строки импорта: повторный импорт обновляет событие, а не создает дубль.
+    # Колонку и ограничение уникальности events_uuid_key добавляет migrate_events.py, он же
+    # предварительно удаляет события с повторяющимся uuid (остается последнее по id)
+    uuid: Mapped[Optional[str]] = Column(String, unique=True, nullable=True)
+
     address: Mapped[Optional[str]] = Column(String, nullable=True)
     comment: Mapped[Optional[str]] = Column(String, nullable=True)
 
@@ -191,10 +235,37 @@ class Event(BaseModel):
     work: Mapped[Optional[str]] = Column(Text, nullable=True)
     worker: Mapped[Optional[str]] = Column(String, nullable=True)
 
-    geom: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)
+    geom: Mapped[Optional[list]] = mapped_column(PackedLatLon, nullable=True)
+
+    # Ограничивающий прямоугольник geom, заполняется вместе с ним
+    min_lat: Mapped[Optional[float]] = Column(Float, nullable=True)
+    min_lon: Mapped[Optional[float]] = Column(Float, nullable=True)
+    max_lat: Mapped[Optional[float]] = Column(Float, nullable=True)
+    max_lon: Mapped[Optional[float]] = Column(Float, nullable=True)
 
     category_id: Mapped[int] = mapped_column(ForeignKey('event_categories.id'))
     category: Mapped['EventCategory'] = relationship('EventCategory', back_populates='events')
 
+    __table_args__ = (Index('ix_events_bbox', 'min_lat', 'max_lat', 'min_lon', 'max_lon'),)
+
+    @staticmethod
+    def bbox_columns(geom: Optional[list]) -> Dict[str, Optional[float]]:
+        """Значения колонок bbox для геометрии; для пакетных INSERT, где валидаторы модели не вызываются"""
+        if not geom:
+            return {'min_lat': None, 'min_lon': None, 'max_lat': None, 'max_lon': None}
+
+        latitudes = [point['lat'] for point in geom]
+        longitudes = [point['lon'] for point in geom]
+
+        return {'min_lat': min(latitudes), 'min_lon': min(longitudes),
+                'max_lat': max(latitudes), 'max_lon': max(longitudes)}
+
+    @validates('geom')
+    def update_bbox(self, key, geom):
+        for column, value in self.bbox_columns(geom).items():
+            setattr(self, column, value)
+
+        return geom
+
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -1,11 +1,18 @@
+import argparse
+import asyncio
+import hashlib
 import json
 import csv
-from collections import defaultdict
-from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
-import re
+import os
+import sys
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, Set
+from dataclasses import dataclass, field
 
-from api.services.external.geocoder_service import DgisGeocoder
+from api.services.external.geocoder_service import AsyncDgisGeocoder
+from api.services.internal.noise_columns import NoiseColumnsBuilder
 
 
 @dataclass
@@ -22,10 +29,158 @@ class NoiseAnalysisResult:
     last_check_date: str
 
 
+@dataclass
+class AddressAggregate:
+    """Накопленная по мере чтения CSV статистика обращений одного адреса"""
+    address: str
+    total_complaints: int = 0
+    noisy_complaints: int = 0
+    noise_sources: Set[str] = field(default_factory=set)
+    last_check_date: Optional[str] = None  # дата последнего обращения
+    lat: Optional[float] = None  # координаты из последнего обращения
+    lon: Optional[float] = None
+    has_coordinates: bool = False  # были ли координаты хотя бы в одном обращении
+
+
+@dataclass
+class NoiseIncrementalState:
+    """
+    Состояние инкрементальной сборки датасета: агрегаты по адресам и уже учтенная часть CSV.
+
+    Если CSV только дописан в конец (совпадает хеш уже разобранного начала файла), разбираются
+    только новые байты. Иначе новые строки определяются по хешам уже учтенных строк.
+
+    Хеши строк (по ROW_HASH_SIZE байт) дописываются в отдельный файл <state>.rows и читаются
+    только когда начало CSV изменилось, поэтому JSON состояния не растет с числом строк CSV.
+    """
+    header: str = ''
+    processed_bytes: int = 0
+    processed_lines: int = 2  # строки заголовков
+    prefix_digest: str = ''
+    row_hash_count: int = 0  # сколько хешей в файле <state>.rows относится к этому состоянию
+    aggregates: Dict[str, AddressAggregate] = field(default_factory=dict)
+    new_row_hashes: List[bytes] = field(default_factory=list)  # хеши этого запуска, пишутся в save()
+
+    ROW_HASH_SIZE = 8
+
+    @staticmethod
+    def rows_path(path: str) -> str:
+        return f"{path}.rows"
+
+    @classmethod
+    def load(cls, path: str) -> 'NoiseIncrementalState':
+        if not os.path.exists(path):
+            return cls()
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        aggregates = {}
+        for address, values in data.pop('aggregates').items():
+            values['noise_sources'] = set(values['noise_sources'])
+            aggregates[address] = AddressAggregate(address=address, **values)
+
+        # Прежний формат хранил хеши строк списком в JSON, при сохранении они переносятся в <state>.rows
+        legacy_hashes = [bytes.fromhex(row_hash) for row_hash in data.pop('row_hashes', [])]
+
+        return cls(aggregates=aggregates, new_row_hashes=legacy_hashes, **data)
+
+    def load_row_hashes(self, path: str) -> Counter:
+        """Хеши всех учтенных строк с числом повторов"""
+        size = self.row_hash_count * self.ROW_HASH_SIZE
+        data = b''
+
+        if size and os.path.exists(self.rows_path(path)):
+            with open(self.rows_path(path), 'rb') as f:
+                data = f.read(size)
+
+        if len(data) < size:
+            print(f"ВНИМАНИЕ: в {self.rows_path(path)} не хватает хешей строк, часть строк будет учтена повторно")
+
+        step = self.ROW_HASH_SIZE
+        known_rows = Counter(data[start:start + step] for start in range(0, len(data), step))
+        known_rows.update(self.new_row_hashes)
+
+        return known_rows
+
+    def save(self, path: str):
+        # Хвост после row_hash_count остается от прерванного запуска и отбрасывается
+        rows_path = self.rows_path(path)
+        with open(rows_path, 'r+b' if os.path.exists(rows_path) else 'wb') as f:
+            f.truncate(self.row_hash_count * self.ROW_HASH_SIZE)
+            f.seek(0, os.SEEK_END)
+            f.write(b''.join(self.new_row_hashes))
+
+        self.row_hash_count += len(self.new_row_hashes)
+        self.new_row_hashes = []
+
+        data = {
+            'header': self.header,
+            'processed_bytes': self.processed_bytes,
+            'processed_lines': self.processed_lines,
+            'prefix_digest': self.prefix_digest,
+            'row_hash_count': self.row_hash_count,
+            'aggregates': {
+                address: {
+                    'total_complaints': aggregate.total_complaints,
+                    'noisy_complaints': aggregate.noisy_complaints,
+                    'noise_sources': sorted(aggregate.noise_sources),
+                    'last_check_date': aggregate.last_check_date,
+                    'lat': aggregate.lat,
+                    'lon': aggregate.lon,
+                    'has_coordinates': aggregate.has_coordinates
+                }
+                for address, aggregate in self.aggregates.items()
+            }
+        }
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+        os.replace(tmp_path, path)
+
+
+# Скобки вокруг категории шума ("[Автотранспорт]") удаляются через str.translate
+CATEGORY_BRACKETS = str.maketrans('', '', '[]')
+
+
+class NoiseTextMatcher:
+    """
+    Разбор текста результатов обращения по заранее собранным таблицам фраз: текст один раз
+    приводится к нижнему регистру, затем каждая фраза ищется отдельной проверкой `in`
+    (ключевые фразы - в порядке приоритета до первого совпадения, источники шума - все).
+
+    Это N поисков подстроки, а не один проход по тексту. Автомат Ахо-Корасик на чистом Python
+    дает те же совпадения, но на коротких текстах обращений в несколько раз медленнее
+    (см. benchmarks/noise_matcher.py): поиск `in` выполняется в C.
+    """
+
+    def __init__(self, noise_keywords: Dict[str, bool], sources: List[str]):
+        self.noise_keywords = tuple(noise_keywords.items())
+        self.sources = tuple(sources)
+
+    def match(self, results_text: str) -> Tuple[bool, List[str]]:
+        """Возвращает (есть ли шум, источники шума из текста)"""
+        if not results_text:
+            return False, []
+
+        results_lower = results_text.lower()
+
+        for phrase, is_noisy in self.noise_keywords:
+            if phrase in results_lower:
+                break
+        else:
+            # Если явных указаний нет, считаем что шум есть (осторожный подход)
+            is_noisy = True
+
+        return is_noisy, [source for source in self.sources if source in results_lower]
+
+
 class NoiseAnalysisService:
     """Сервис для анализа шумовых обращений"""
 
-    def __init__(self, geocoder: DgisGeocoder):
+    def __init__(self, geocoder: AsyncDgisGeocoder):
         self.geocoder = geocoder
         self.noise_keywords = {
             'превышения нормативов': True,
@@ -35,6 +190,15 @@ class NoiseAnalysisService:
             'не производились': False
         }
 
+        self.common_sources = [
+            'автотранспорт', 'строительные работы', 'вентиляционные системы',
+            'генераторная установка', 'промышленное предприятие', 'железнодорожный транспорт',
+            'дорожно-ремонтные работы', 'погрузочно-разгрузочные работы', 'летнее кафе',
+            'автомойка', 'музыка', 'кафе', 'ресторан', 'клуб'
+        ]
+
+        self.text_matcher = NoiseTextMatcher(self.noise_keywords, self.common_sources)
+
         self.frequency_thresholds = {
             'низкая': 1,
             'средняя': 3,
@@ -42,81 +206,93 @@ class NoiseAnalysisService:
         }
 
     def parse_csv_file(self, file_path: str) -> List[Dict[str, Any]]:
-        """Парсинг CSV файла с обращениями по шуму"""
-        records = []
+        """Парсинг CSV файла с обращениями по шуму в список записей"""
+        return list(self.iter_csv_records(file_path))
+
+    def iter_csv_records(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """Построчное чтение CSV файла с обращениями по шуму, файл целиком в память не загружается"""
+        parsed_count = 0
 
         try:
             with open(file_path, 'r', encoding='utf-8') as file:
-                # Читаем все строки
-                lines = file.readlines()
-                print(f"Всего строк в файле: {len(lines)}")
+                fieldnames = self._read_fieldnames(file)
 
-                # Пропускаем первые две строки с заголовками
-                data_lines = lines[2:]  # пропускаем строки 0 и 1
-                print(f"Строк с данными: {len(data_lines)}")
+                for line_num, line in enumerate(file, start=3):
+                    record = self.parse_csv_line(fieldnames, line, line_num)
+                    if record is None:
+                        continue
 
-                # Определяем имена полей из первой строки заголовков
-                fieldnames_line = lines[0].strip().split(';')
-                fieldnames = [field.strip('"') for field in fieldnames_line]
-                print(f"Поля CSV: {fieldnames}")
+                    # Отладочная информация для первых нескольких записей
+                    if parsed_count < 5:
+                        self._print_record_example(record, line_num)
 
-                for line_num, line in enumerate(data_lines, start=3):
-                    try:
-                        if not line.strip():
-                            continue
+                    parsed_count += 1
+                    yield record
 
-                        # Разбиваем строку по точкам с запятой
-                        row_data = line.strip().split(';')
+        except Exception as e:
+            print(f"Ошибка чтения файла {file_path}: {e}")
+            import traceback
+            traceback.print_exc()
 
-                        # Создаем словарь из данных
-                        row_dict = {}
-                        for i, field in enumerate(fieldnames):
-                            if i < len(row_data):
-                                # Убираем кавычки из значений
-                                value = row_data[i].strip('"').strip()
-                                row_dict[field] = value
-                            else:
-                                row_dict[field] = ""
+        print(f"Успешно обработано {parsed_count} записей")
 
-                        address = row_dict.get('Location', '')
-                        if not address:
-                            print(f"Пропущена строка {line_num}: отсутствует адрес")
-                            continue
+    def _read_fieldnames(self, file) -> List[str]:
+        """Имена полей из первой строки заголовков, вторая строка заголовков пропускается"""
+        fieldnames_line = file.readline().strip().split(';')
+        file.readline()
 
-                        record = {
-                            'id': row_dict.get('ID', '').strip(),
-                            'date': row_dict.get('Date', '').strip(),
-                            'address': address,
-                            'district': row_dict.get('District', '').strip(),
-                            'adm_area': row_dict.get('AdmArea', '').strip(),
-                            'noise_category': row_dict.get('NoiseCategory', '').strip(),
-                            'results': row_dict.get('Results', '').strip(),
-                            'longitude': self._parse_coordinate(row_dict.get('Longitude_WGS84', '')),
-                            'latitude': self._parse_coordinate(row_dict.get('Latitude_WGS84', ''))
-                        }
-
-                        # Отладочная информация для первых нескольких записей
-                        if len(records) < 5:
-                            print(f"Пример записи {line_num}:")
-                            print(f"  Адрес: {address}")
-                            print(f"  Координаты: {record['latitude']}, {record['longitude']}")
-                            print(f"  Дата: {record['date']}")
-                            print(f"  Категория: {record['noise_category']}")
-
-                        records.append(record)
+        fieldnames = [field.strip('"') for field in fieldnames_line]
+        print(f"Поля CSV: {fieldnames}")
 
-                    except Exception as e:
-                        print(f"Ошибка обработки строки {line_num}: {e}")
-                        print(f"Содержание строки: {line}")
-                        continue
+        return fieldnames
+
+    def parse_csv_line(self, fieldnames: List[str], line: str, line_num: int) -> Optional[Dict[str, Any]]:
+        """Разбор одной строки CSV в запись обращения, None для пустых и ошибочных строк"""
+        try:
+            if not line.strip():
+                return None
+
+            # Разбиваем строку по точкам с запятой
+            row_data = line.strip().split(';')
+
+            # Создаем словарь из данных
+            row_dict = {}
+            for i, field in enumerate(fieldnames):
+                if i < len(row_data):
+                    # Убираем кавычки из значений
+                    value = row_data[i].strip('"').strip()
+                    row_dict[field] = value
+                else:
+                    row_dict[field] = ""
+
+            address = row_dict.get('Location', '')
+            if not address:
+                print(f"Пропущена строка {line_num}: отсутствует адрес")
+                return None
+
+            return {
+                'id': row_dict.get('ID', '').strip(),
+                'date': row_dict.get('Date', '').strip(),
+                'address': address,
+                'district': row_dict.get('District', '').strip(),
+                'adm_area': row_dict.get('AdmArea', '').strip(),
+                'noise_category': row_dict.get('NoiseCategory', '').strip(),
+                'results': row_dict.get('Results', '').strip(),
+                'longitude': self._parse_coordinate(row_dict.get('Longitude_WGS84', '')),
+                'latitude': self._parse_coordinate(row_dict.get('Latitude_WGS84', ''))
+            }
 
         except Exception as e:
-            print(f"Ошибка чтения файла {file_path}: {e}")
-            import traceback
-            traceback.print_exc()
+            print(f"Ошибка обработки строки {line_num}: {e}")
+            print(f"Содержание строки: {line}")
+            return None
 
-        print(f"Успешно обработано {len(records)} записей")
-        return records
+    def _print_record_example(self, record: Dict[str, Any], line_num: int):
+        print(f"Пример записи {line_num}:")
+        print(f"  Адрес: {record['address']}")
+        print(f"  Координаты: {record['latitude']}, {record['longitude']}")
+        print(f"  Дата: {record['date']}")
+        print(f"  Категория: {record['noise_category']}")
 
     def _parse_coordinate(self, coord_str: str) -> Optional[float]:
         """Парсинг координат из строки"""
@@ -132,68 +308,51 @@ class NoiseAnalysisService:
             print(f"Ошибка парсинга координаты '{coord_str}': {e}")
             return None
 
-    def geocode_address(self, address: str, city: str = "Москва") -> Optional[Tuple[float, float]]:
-        """Геокодирование адреса в координаты"""
-        try:
-            # Добавляем город к адресу для лучшего геокодирования
-            full_address = f"{city}, {address}"
-            print(f"Геокодирование адреса: {full_address}")
+    def geocode_addresses(self, addresses: List[str], city: str = "Москва") -> Dict[str, Optional[Tuple[float, float]]]:
+        """Пакетное геокодирование адресов: сначала кеш, остальные параллельно с ограничением частоты"""
+        if not addresses:
+            return {}
 
-            result = self.geocoder.geocode(full_address)
+        print(f"Геокодирование {len(addresses)} адресов")
 
-            if result:
-                print(f"Успешно геокодировано: {result['lat']}, {result['lon']}")
-                return result['lat'], result['lon']
-            else:
-                print(f"Не удалось геокодировать адрес: {full_address}")
-                return None
+        async def geocode() -> Dict[str, Optional[Tuple[float, float]]]:
+            try:
+                return await self.geocoder.geocode_many(addresses, city=city)
+            finally:
+                await self.geocoder.aclose()
 
+        try:
+            results = asyncio.run(geocode())
         except Exception as e:
-            print(f"Ошибка геокодирования адреса {address}: {e}")
-            return None
-
-    def analyze_noise_result(self, results_text: str) -> bool:
-        """Анализ текста результатов на наличие шума"""
-        if not results_text:
-            return False
+            print(f"Ошибка геокодирования адресов: {e}")
+            return {}
 
-        results_lower = results_text.lower()
+        print(f"Геокодировано {sum(1 for coords in results.values() if coords)}/{len(addresses)} адресов "
+              f"(из кеша: {self.geocoder.cache_hits}, запросов к 2GIS: {self.geocoder.requests_made})")
 
-        # Проверяем ключевые фразы в порядке приоритета
-        for phrase, is_noisy in self.noise_keywords.items():
-            if phrase in results_lower:
-                return is_noisy
+        return results
 
-        # Если явных указаний нет, считаем что шум есть (осторожный подход)
-        return True
+    def analyze_noise_result(self, results_text: str) -> bool:
+        """Анализ текста результатов на наличие шума"""
+        return self.text_matcher.match(results_text)[0]
 
     def extract_noise_sources(self, noise_category: str, results_text: str) -> List[str]:
         """Извлечение источников шума из категории и результатов"""
-        sources = []
+        return self.classify_complaint(noise_category, results_text)[1]
+
+    def classify_complaint(self, noise_category: str, results_text: str) -> Tuple[bool, List[str]]:
+        """Шумность и уникальные источники шума одного обращения за один разбор текста результатов"""
+        is_noisy, sources = self.text_matcher.match(results_text)
 
         # Источники из категории шума
         if noise_category and noise_category != "None" and noise_category != "null":
             # Очищаем категорию от лишних символов
-            category_clean = re.sub(r'[\[\]]', '', noise_category)
-            if category_clean and category_clean != "None":
+            category_clean = noise_category.translate(CATEGORY_BRACKETS)
+            # Источники из текста уникальны, дубликатом может быть только категория
+            if category_clean and category_clean != "None" and category_clean not in sources:
                 sources.append(category_clean)
 
-        # Дополнительные источники из текста результатов
-        if results_text:
-            results_lower = results_text.lower()
-            common_sources = [
-                'автотранспорт', 'строительные работы', 'вентиляционные системы',
-                'генераторная установка', 'промышленное предприятие', 'железнодорожный транспорт',
-                'дорожно-ремонтные работы', 'погрузочно-разгрузочные работы', 'летнее кафе',
-                'автомойка', 'музыка', 'кафе', 'ресторан', 'клуб'
-            ]
-
-            for source in common_sources:
-                if source in results_lower:
-                    sources.append(source)
-
-        # Убираем дубликаты
-        return list(set(sources))
+        return is_noisy, sources
 
     def calculate_complaint_frequency(self, complaint_count: int) -> str:
         """Определение частоты обращений"""
@@ -204,39 +363,168 @@ class NoiseAnalysisService:
         else:
             return 'низкая'
 
-    def analyze_complaints(self, records: List[Dict[str, Any]]) -> List[NoiseAnalysisResult]:
-        """Анализ всех обращений и группировка по адресам"""
-        # Группируем обращения по адресам
-        address_groups = defaultdict(list)
+    def add_complaint(self, aggregate: AddressAggregate, record: Dict[str, Any]):
+        """Учет одного обращения в статистике адреса"""
+        aggregate.total_complaints += 1
+
+        is_noisy, sources = self.classify_complaint(record['noise_category'], record['results'])
+
+        if is_noisy:
+            aggregate.noisy_complaints += 1
+
+        # Собираем источники шума
+        aggregate.noise_sources.update(sources)
+
+        # Дата и координаты берутся из последнего обращения (при равных датах - из первого в файле)
+        if aggregate.last_check_date is None or record['date'] > aggregate.last_check_date:
+            aggregate.last_check_date = record['date']
+            aggregate.lat = record['latitude']
+            aggregate.lon = record['longitude']
+
+        if record['latitude'] and record['longitude']:
+            aggregate.has_coordinates = True
+
+    def aggregate_complaints(self, records: Iterable[Dict[str, Any]]) -> Dict[str, AddressAggregate]:
+        """Группировка обращений по адресам по мере чтения, сами обращения не сохраняются"""
+        aggregates = {}
 
         for record in records:
             address = record['address']
-            address_groups[address].append(record)
+            aggregate = aggregates.get(address)
 
-        results = []
+            if aggregate is None:
+                aggregate = aggregates[address] = AddressAggregate(address=address)
 
-        print(f"Найдено {len(address_groups)} уникальных адресов")
+            self.add_complaint(aggregate, record)
 
-        for address, complaints in address_groups.items():
-            print(f"Анализ адреса: {address}, обращений: {len(complaints)}")
+        return aggregates
 
-            # Сортируем по дате (последние сначала)
-            complaints_sorted = sorted(
-                complaints,
-                key=lambda x: x['date'],
-                reverse=True
-            )
+    def merge_aggregates(self, aggregates: Dict[str, AddressAggregate], partial: Dict[str, AddressAggregate]):
+        """Добавляет статистику следующего по порядку куска файла; результат как при последовательном чтении"""
+        for address, part in partial.items():
+            aggregate = aggregates.get(address)
+
+            if aggregate is None:
+                aggregates[address] = part
+                continue
+
+            aggregate.total_complaints += part.total_complaints
+            aggregate.noisy_complaints += part.noisy_complaints
+            aggregate.noise_sources.update(part.noise_sources)
+            aggregate.has_coordinates = aggregate.has_coordinates or part.has_coordinates
+
+            # При равных датах остается обращение из более раннего куска
+            if part.last_check_date > aggregate.last_check_date:
+                aggregate.last_check_date = part.last_check_date
+                aggregate.lat = part.lat
+                aggregate.lon = part.lon
+
+    def aggregate_csv_parallel(self, file_path: str, workers: int,
+                               chunk_size: int = 20000) -> Tuple[Dict[str, AddressAggregate],
+                                                                 Dict[str, Optional[Tuple[float, float]]]]:
+        """
+        Чтение и группировка CSV в пуле из workers процессов.
+
+        Файл режется на куски по chunk_size строк, каждый кусок разбирается и группируется в отдельном
+        процессе, частичные результаты объединяются в порядке кусков. Одновременно в обработке не больше
+        2 * workers кусков. Адреса без координат геокодируются в фоновом потоке, пока идет разбор.
+        """
+        aggregates: Dict[str, AddressAggregate] = {}
+
+        geocode_executor = ThreadPoolExecutor(max_workers=1)
+        geocode_futures = []
+        submitted = set()
+
+        def submit_geocoding(addresses: List[str]):
+            new_addresses = [address for address in addresses if address not in submitted]
+            if new_addresses:
+                submitted.update(new_addresses)
+                geocode_futures.append(geocode_executor.submit(self.geocode_addresses, new_addresses))
+
+        try:
+            with open(file_path, 'r', encoding='utf-8') as file, \
+                    ProcessPoolExecutor(max_workers=workers) as pool:
+                fieldnames = self._read_fieldnames(file)
+                pending = deque()
+
+                def collect():
+                    partial = pending.popleft().result()
+                    self.merge_aggregates(aggregates, partial)
+                    # Заранее геокодируем адреса, у которых пока не было координат ни в одном обращении
+                    submit_geocoding([address for address in partial if not aggregates[address].has_coordinates])
+
+                for start_line, lines in self._iter_line_chunks(file, chunk_size, start=3):
+                    pending.append(pool.submit(_aggregate_chunk, fieldnames, lines, start_line))
+
+                    if len(pending) >= 2 * workers:
+                        collect()
+
+                while pending:
+                    collect()
+
+        except Exception as e:
+            print(f"Ошибка чтения файла {file_path}: {e}")
+            import traceback
+            traceback.print_exc()
+
+        # Адрес мог получить координаты из более позднего обращения, но мог и потерять их
+        submit_geocoding([address for address, aggregate in aggregates.items()
+                          if not (aggregate.lat and aggregate.lon)])
+
+        geocoded = {}
+        for future in geocode_futures:
+            geocoded.update(future.result())
+        geocode_executor.shutdown()
+
+        print(f"Успешно обработано {sum(aggregate.total_complaints for aggregate in aggregates.values())} записей")
+        return aggregates, geocoded
+
+    @staticmethod
+    def _iter_line_chunks(file, chunk_size: int, start: int) -> Iterator[Tuple[int, List[str]]]:
+        """Куски по chunk_size строк вместе с номером первой строки куска"""
+        lines = []
+        line_num = start
+
+        for line in file:
+            lines.append(line)
 
-            # Берем координаты из первой записи или геокодируем
+            if len(lines) >= chunk_size:
+                yield line_num, lines
+                line_num += len(lines)
+                lines = []
+
+        if lines:
+            yield line_num, lines
+
+    def analyze_complaints(self, records: Iterable[Dict[str, Any]]) -> List[NoiseAnalysisResult]:
+        """Анализ всех обращений и группировка по адресам"""
+        return list(self.iter_analysis_results(self.aggregate_complaints(records)))
+
+    def iter_analysis_results(self, aggregates: Dict[str, AddressAggregate],
+                              geocoded: Optional[Dict[str, Optional[Tuple[float, float]]]] = None
+                              ) -> Iterator[NoiseAnalysisResult]:
+        """
+        Результаты анализа по адресам. Если geocoded не передан, адреса без координат в CSV
+        геокодируются одним пакетом.
+        """
+        print(f"Найдено {len(aggregates)} уникальных адресов")
+
+        if geocoded is None:
+            addresses_to_geocode = [address for address, aggregate in aggregates.items()
+                                    if not (aggregate.lat and aggregate.lon)]
+            geocoded = self.geocode_addresses(addresses_to_geocode)
+
+        for address, aggregate in aggregates.items():
+            print(f"Анализ адреса: {address}, обращений: {aggregate.total_complaints}")
+
+            # Берем координаты из последнего обращения или геокодируем
             lat, lon = None, None
-            if complaints_sorted[0]['latitude'] and complaints_sorted[0]['longitude']:
-                lat = complaints_sorted[0]['latitude']
-                lon = complaints_sorted[0]['longitude']
+            if aggregate.lat and aggregate.lon:
+                lat = aggregate.lat
+                lon = aggregate.lon
                 print(f"Использованы координаты из CSV: {lat}, {lon}")
             else:
-                # Геокодируем адрес
-                print(f"Геокодирование адреса: {address}")
-                coords = self.geocode_address(address)
+                coords = geocoded.get(address)
                 if coords:
                     lat, lon = coords
                     print(f"Геокодированные координаты: {lat}, {lon}")
@@ -245,22 +533,8 @@ class NoiseAnalysisService:
                 print(f"Не удалось получить координаты для адреса: {address}")
                 continue
 
-            # Анализируем результаты обращений
-            total_complaints = len(complaints)
-            noisy_complaints = 0
-            all_noise_sources = []
-
-            for complaint in complaints:
-                is_noisy = self.analyze_noise_result(complaint['results'])
-                if is_noisy:
-                    noisy_complaints += 1
-
-                # Собираем источники шума
-                sources = self.extract_noise_sources(
-                    complaint['noise_category'],
-                    complaint['results']
-                )
-                all_noise_sources.extend(sources)
+            total_complaints = aggregate.total_complaints
+            noisy_complaints = aggregate.noisy_complaints
 
             # Определяем общий уровень шума
             # Если более 50% обращений подтверждают шум - считаем адрес шумным
@@ -270,13 +544,10 @@ class NoiseAnalysisService:
             print(
                 f"Адрес {address}: шумных обращений {noisy_complaints}/{total_complaints} ({(noise_ratio * 100):.1f}%)")
 
-            # Уникальные источники шума
-            unique_sources = list(set(all_noise_sources))
-
             # Частота обращений
             frequency = self.calculate_complaint_frequency(total_complaints)
 
-            result = NoiseAnalysisResult(
+            yield NoiseAnalysisResult(
                 lat=lat,
                 lon=lon,
                 address=address,
@@ -284,80 +555,243 @@ class NoiseAnalysisService:
                 complaint_frequency=frequency,
                 total_complaints=total_complaints,
                 noisy_complaints=noisy_complaints,
-                noise_sources=unique_sources,
-                last_check_date=complaints_sorted[0]['date']
+                noise_sources=sorted(aggregate.noise_sources),  # сортировка - для одинакового JSON при повторных запусках
+                last_check_date=aggregate.last_check_date
             )
 
-            results.append(result)
+    @staticmethod
+    def result_to_dict(result: NoiseAnalysisResult) -> Dict[str, Any]:
+        """Запись выходного JSON для одного адреса"""
+        return {
+            'latitude': result.lat,
+            'longitude': result.lon,
+            'address': result.address,
+            'is_noisy': result.is_noisy,
+            'complaint_frequency': result.complaint_frequency,
+            'total_complaints': result.total_complaints,
+            'noisy_complaints': result.noisy_complaints,
+            'noise_sources': result.noise_sources,
+            'last_check_date': result.last_check_date,
+            'noise_ratio': round(result.noisy_complaints / result.total_complaints, 2)
+        }
 
-        return results
+    def save_to_json(self, results: Iterable[NoiseAnalysisResult], output_file: str,
+                     columns_file: Optional[str] = None) -> int:
+        """Сохранение результатов в JSON файл по одной записи, формат как у json.dump(indent=2)"""
+        return self.write_json_records((self.result_to_dict(result) for result in results), output_file,
+                                       columns_file)
+
+    @staticmethod
+    def write_json_records(records: Iterable[Dict[str, Any]], output_file: str,
+                           columns_file: Optional[str] = None) -> int:
+        """
+        Потоковая запись списка словарей в JSON. Файл пишется рядом и подменяется целиком,
+        чтобы API, перечитывающий датасет при изменении файла, не увидел его наполовину записанным.
+
+        Если задан columns_file, те же записи сохраняются еще и в колоночном бинарном формате,
+        который API отображает в память без разбора JSON. Он пишется после JSON, поэтому не старше его.
+        """
+        columns = NoiseColumnsBuilder() if columns_file else None
+        saved_count = 0
+        tmp_file = f"{output_file}.tmp"
+
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write('[')
+
+            for record in records:
+                item = json.dumps(record, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+                f.write(f'{"," if saved_count else ""}\n  {item}')
+                saved_count += 1
+
+                if columns is not None:
+                    columns.add(record)
+
+            f.write('\n]' if saved_count else ']')
+
+        os.replace(tmp_file, output_file)
+        print(f"Сохранено {saved_count} записей в {output_file}")
+
+        if columns is not None:
+            columns.save(columns_file)
+            print(f"Колоночная копия сохранена в {columns_file}")
+
+        return saved_count
+
+    def process_noise_data_incremental(self, csv_file_path: str, output_json_path: str, state_path: str,
+                                       output_columns_path: Optional[str] = None):
+        """
+        Инкрементальное обновление датасета: учитываются только новые строки CSV, пересчитываются
+        только затронутые ими адреса, остальные записи берутся из прежнего JSON без изменений.
+        """
+        started_at = time.perf_counter()
+        print("=" * 50)
+        print("Инкрементальное обновление данных о шуме")
+        print("=" * 50)
 
-    def save_to_json(self, results: List[NoiseAnalysisResult], output_file: str):
-        """Сохранение результатов в JSON файл"""
-        output_data = []
-
-        for result in results:
-            result_dict = {
-                'latitude': result.lat,
-                'longitude': result.lon,
-                'address': result.address,
-                'is_noisy': result.is_noisy,
-                'complaint_frequency': result.complaint_frequency,
-                'total_complaints': result.total_complaints,
-                'noisy_complaints': result.noisy_complaints,
-                'noise_sources': result.noise_sources,
-                'last_check_date': result.last_check_date,
-                'noise_ratio': round(result.noisy_complaints / result.total_complaints, 2)
-            }
-            output_data.append(result_dict)
+        state = NoiseIncrementalState.load(state_path)
+        affected = set()
+        new_rows = 0
+
+        with open(csv_file_path, 'rb') as file:
+            header_lines = file.readline() + file.readline()
+            header = header_lines.decode('utf-8')
+
+            # Без состояния прежний JSON мог быть собран из других данных, поэтому он не переиспользуется
+            rebuild = state.header != header
+            if rebuild:
+                if state.header:
+                    print("Заголовки CSV изменились, датасет будет собран заново")
+                state = NoiseIncrementalState(header=header)
+
+            fieldnames = [field.strip('"') for field in header.splitlines()[0].strip().split(';')] if header else []
+
+            digest = hashlib.blake2b(header_lines, digest_size=16)
+            known_rows = None
+            line_num = 2
+
+            if state.processed_bytes and self._update_digest(file, digest, state.processed_bytes) == state.prefix_digest:
+                print(f"CSV дополнен в конце, разбираются строки после {state.processed_lines}")
+                line_num = state.processed_lines
+            else:
+                if state.processed_bytes:
+                    print("Начало CSV изменилось, новые строки определяются по хешам")
+
+                file.seek(len(header_lines))
+                digest = hashlib.blake2b(header_lines, digest_size=16)
+                known_rows = state.load_row_hashes(state_path)
+
+            for raw_line in file:
+                line_num += 1
+                digest.update(raw_line)
+                row_hash = hashlib.blake2b(raw_line.rstrip(b'\r\n'),
+                                           digest_size=NoiseIncrementalState.ROW_HASH_SIZE).digest()
+
+                if known_rows is not None and known_rows[row_hash] > 0:
+                    known_rows[row_hash] -= 1
+                    continue
+
+                state.new_row_hashes.append(row_hash)
+
+                record = self.parse_csv_line(fieldnames, raw_line.decode('utf-8'), line_num)
+                if record is None:
+                    continue
+
+                address = record['address']
+                aggregate = state.aggregates.get(address)
+                if aggregate is None:
+                    aggregate = state.aggregates[address] = AddressAggregate(address=address)
+
+                self.add_complaint(aggregate, record)
+                affected.add(address)
+                new_rows += 1
+
+            state.processed_bytes = file.tell()
+            state.processed_lines = line_num
+            state.prefix_digest = digest.hexdigest()
+
+        missing_rows = sum(known_rows.values()) if known_rows else 0
+        if missing_rows:
+            print(f"ВНИМАНИЕ: из CSV пропали {missing_rows} ранее учтенных строк, они остаются в статистике. "
+                  f"Для точного результата удалите {state_path} и соберите датасет заново")
+
+        print(f"Новых обращений: {new_rows}, затронуто адресов: {len(affected)}")
+
+        old_records = None
+        if not rebuild and os.path.exists(output_json_path):
+            with open(output_json_path, 'r', encoding='utf-8') as f:
+                old_records = {record['address']: record for record in json.load(f)}
+
+        if old_records is None:
+            # Прежнего результата нет - пересчитываются все адреса
+            affected = set(state.aggregates)
+        elif not affected:
+            state.save(state_path)
+            print(f"Датасет не изменился ({time.perf_counter() - started_at:.1f} с)")
+            return
 
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        updated = {
+            result.address: self.result_to_dict(result)
+            for result in self.iter_analysis_results({address: state.aggregates[address] for address in affected})
+        }
+
+        def merged_records() -> Iterator[Dict[str, Any]]:
+            for address in state.aggregates:
+                record = updated.get(address) if address in affected else old_records.get(address)
+                if record is not None:
+                    yield record
+
+        self.write_json_records(merged_records(), output_json_path, output_columns_path)
+        state.save(state_path)
+
+        print(f"Обновлено {len(updated)} записей за {time.perf_counter() - started_at:.1f} с")
+
+    @staticmethod
+    def _update_digest(file, digest, size: int) -> str:
+        """Дочитывает файл до позиции size, обновляя хеш, и возвращает его текущее значение"""
+        left = size - file.tell()
 
-        print(f"Сохранено {len(output_data)} записей в {output_file}")
+        while left > 0:
+            block = file.read(min(left, 1 << 20))
+            if not block:
+                break
+            digest.update(block)
+            left -= len(block)
 
-    def process_noise_data(self, csv_file_path: str, output_json_path: str):
-        """Полный процесс обработки данных о шуме"""
+        return digest.hexdigest() if left == 0 else ''
+
+    def process_noise_data(self, csv_file_path: str, output_json_path: str, workers: int = 1,
+                           output_columns_path: Optional[str] = None):
+        """Полный процесс обработки данных о шуме, при workers > 1 - в пуле процессов"""
         print("=" * 50)
         print("Начало обработки данных о шуме")
         print("=" * 50)
 
-        print("Чтение CSV файла...")
-        records = self.parse_csv_file(csv_file_path)
+        print("Чтение CSV файла и группировка обращений по адресам...")
+        geocoded = None
+
+        if workers > 1:
+            aggregates, geocoded = self.aggregate_csv_parallel(csv_file_path, workers=workers)
+        else:
+            aggregates = self.aggregate_complaints(self.iter_csv_records(csv_file_path))
 
-        if not records:
+        if not aggregates:
+            geocoded = None
             print("ОШИБКА: Не удалось прочитать ни одной записи из CSV файла")
             print("Попробуем альтернативный метод чтения...")
-            records = self._parse_csv_alternative(csv_file_path)
+            aggregates = self.aggregate_complaints(self._iter_csv_alternative(csv_file_path))
 
-        if not records:
+        if not aggregates:
             print("Не удалось прочитать данные. Проверьте файл.")
             return
 
-        print(f"Прочитано {len(records)} записей")
+        print(f"Прочитано {sum(aggregate.total_complaints for aggregate in aggregates.values())} записей")
+
+        noisy_count = 0
+        freq_dist = defaultdict(int)
 
-        print("Анализ обращений по шуму...")
-        analysis_results = self.analyze_complaints(records)
-        print(f"Проанализировано {len(analysis_results)} уникальных адресов")
+        def with_statistics(results: Iterable[NoiseAnalysisResult]) -> Iterator[NoiseAnalysisResult]:
+            nonlocal noisy_count
 
-        print("Сохранение результатов в JSON...")
-        self.save_to_json(analysis_results, output_json_path)
+            for result in results:
+                noisy_count += result.is_noisy
+                freq_dist[result.complaint_frequency] += 1
+                yield result
+
+        print("Анализ обращений по шуму и сохранение результатов в JSON...")
+        analyzed_count = self.save_to_json(with_statistics(self.iter_analysis_results(aggregates, geocoded)),
+                                           output_json_path, output_columns_path)
+        print(f"Проанализировано {analyzed_count} уникальных адресов")
         print(f"Результаты сохранены в {output_json_path}")
 
         # Статистика
-        if analysis_results:
-            noisy_count = sum(1 for r in analysis_results if r.is_noisy)
+        if analyzed_count:
             print(f"\nСтатистика:")
             print(
-                f"Шумные адреса: {noisy_count}/{len(analysis_results)} ({(noisy_count / len(analysis_results) * 100):.1f}%)")
+                f"Шумные адреса: {noisy_count}/{analyzed_count} ({(noisy_count / analyzed_count * 100):.1f}%)")
             print(
-                f"Тихие адреса: {len(analysis_results) - noisy_count}/{len(analysis_results)} ({((len(analysis_results) - noisy_count) / len(analysis_results) * 100):.1f}%)")
+                f"Тихие адреса: {analyzed_count - noisy_count}/{analyzed_count} ({((analyzed_count - noisy_count) / analyzed_count * 100):.1f}%)")
 
             # Распределение по частоте обращений
-            freq_dist = defaultdict(int)
-            for result in analysis_results:
-                freq_dist[result.complaint_frequency] += 1
-
             print(f"\nРаспределение по частоте обращений:")
             for freq, count in freq_dist.items():
                 print(f"  {freq}: {count} адресов")
@@ -366,7 +800,11 @@ class NoiseAnalysisService:
 
     def _parse_csv_alternative(self, file_path: str) -> List[Dict[str, Any]]:
         """Альтернативный метод парсинга CSV"""
-        records = []
+        return list(self._iter_csv_alternative(file_path))
+
+    def _iter_csv_alternative(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """Альтернативный метод парсинга CSV через csv.reader, построчно"""
+        parsed_count = 0
         try:
             with open(file_path, 'r', encoding='utf-8') as file:
                 reader = csv.reader(file, delimiter=';')
@@ -406,39 +844,90 @@ class NoiseAnalysisService:
                                 'longitude': self._parse_coordinate(row_dict.get('Longitude_WGS84', '')),
                                 'latitude': self._parse_coordinate(row_dict.get('Latitude_WGS84', ''))
                             }
-                            records.append(record)
+                        else:
+                            continue
 
                     except Exception as e:
                         print(f"Ошибка в альтернативном парсинге строки {row_num}: {e}")
                         continue
 
+                    parsed_count += 1
+                    yield record
+
         except Exception as e:
             print(f"Ошибка альтернативного чтения: {e}")
 
-        print(f"Альтернативным методом обработано {len(records)} записей")
-        return records
+        print(f"Альтернативным методом обработано {parsed_count} записей")
+
+
+_worker_service: Optional[NoiseAnalysisService] = None
+
+
+def _aggregate_chunk(fieldnames: List[str], lines: List[str], start_line: int) -> Dict[str, AddressAggregate]:
+    """Разбор и группировка куска строк CSV в процессе пула"""
+    global _worker_service
+
+    if _worker_service is None:
+        _worker_service = NoiseAnalysisService(geocoder=None)
+
+    records = (_worker_service.parse_csv_line(fieldnames, line, line_num)
+               for line_num, line in enumerate(lines, start=start_line))
+
+    return _worker_service.aggregate_complaints(record for record in records if record is not None)
 
 
 # Пример использования
 if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Анализ обращений по шуму")
+    arg_parser.add_argument("--csv", default="data/noise.csv", help="CSV файл с обращениями")
+    arg_parser.add_argument("--output", default="data/noise_analysis_results.json", help="JSON файл с результатами")
+    arg_parser.add_argument("--columns", default="data/noise_analysis_results.bin",
+                            help="Колоночная бинарная копия результатов для API (пустая строка - не сохранять)")
+    arg_parser.add_argument("--geocode-cache", default="data/geocode_cache.sqlite3", help="SQLite кеш геокодирования")
+    arg_parser.add_argument("--workers", type=int, default=1, help="Количество процессов для разбора CSV")
+    arg_parser.add_argument("--incremental", action="store_true",
+                            help="Учитывать только новые строки CSV и обновлять только затронутые адреса")
+    arg_parser.add_argument("--state", default="data/noise_state.json", help="Файл состояния инкрементальной сборки")
+    args = arg_parser.parse_args()
+
+    if args.incremental and args.workers != 1:
+        arg_parser.error("--workers не поддерживается вместе с --incremental: "
+                         "новые строки разбираются в одном процессе")
+
+    # Пауза перед закрытием окна нужна только при запуске из консоли
+    interactive = sys.stdin.isatty()
+
     try:
-        # Инициализация геокодера
-        geocoder = DgisGeocoder()
+        # Инициализация геокодера с кешем уже найденных адресов
+        geocoder = AsyncDgisGeocoder(cache_path=args.geocode_cache)
 
         # Создание сервиса анализа
         noise_service = NoiseAnalysisService(geocoder)
 
         # Обработка данных
-        noise_service.process_noise_data(
-            csv_file_path="data/noise.csv",
-            output_json_path="data/noise_analysis_results.json"
-        )
+        if args.incremental:
+            noise_service.process_noise_data_incremental(
+                csv_file_path=args.csv,
+                output_json_path=args.output,
+                state_path=args.state,
+                output_columns_path=args.columns
+            )
+        else:
+            noise_service.process_noise_data(
+                csv_file_path=args.csv,
+                output_json_path=args.output,
+                workers=args.workers,
+                output_columns_path=args.columns
+            )
+        geocoder.close()
 
-        input("Нажмите Enter для выхода...")
+        if interactive:
+            input("Нажмите Enter для выхода...")
 
     except Exception as e:
         print(f"Критическая ошибка: {e}")
         import traceback
 
         traceback.print_exc()
-        input("Нажмите Enter для выхода...")
\ No newline at end of file
+        if interactive:
+            input("Нажмите Enter для выхода...")
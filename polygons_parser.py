@@ -1,15 +1,158 @@
 # events_importer.py
 from __future__ import annotations
 
+import argparse
 import asyncio
 import csv
+import itertools
+import json
 import logging
-import re
+import os
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
 import httpx
 
+from api.utils.wkt_parser import parse_wkt
+
+
+class ImportCheckpoint:
+    """
+    Контрольная точка импорта в локальном JSON-файле:
+    - watermark: номер строки, до которой (включительно) все строки обработаны;
+    - rows: [номер строки, статус] по uuid для строк после watermark и для строк с ошибкой;
+    - failed_rows: номера строк без uuid, обработанных с ошибкой.
+
+    При повторном запуске пропускаются строки до watermark и строки с uuid в статусе "done",
+    кроме строк с ошибкой: они отправляются снова, сервер делает upsert по uuid. Успешные строки
+    до watermark из rows удаляются, поэтому размер файла не растет с числом импортированных строк.
+    """
+
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, path: Union[str, Path], source: Union[str, Path], save_every: int = 500) -> None:
+        self.path = Path(path)
+        self.source = str(source)
+        self.save_every = max(1, save_every)
+
+        self.watermark = 0
+        self.statuses: Dict[str, Tuple[int, str]] = {}
+        self.failed_rows: set = set()
+
+        self._finished: set = set()  # обработанные строки после watermark
+        self._unsaved = 0
+
+    def load(self, log: logging.Logger) -> None:
+        if not self.path.exists():
+            return
+
+        with self.path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if data.get("source") != self.source:
+            log.warning("Контрольная точка %s относится к файлу %s, импорт начнется сначала",
+                        self.path, data.get("source"))
+            return
+
+        self.watermark = data["watermark"]
+        self.statuses = {row_id: (row_num, status) for row_id, (row_num, status) in data["rows"].items()}
+        self.failed_rows = set(data.get("failed_rows", []))
+        failed = len(self.failed_rows) + sum(status == self.FAILED for _, status in self.statuses.values())
+        log.info("Продолжение импорта: обработано строк подряд %s, строк с ошибкой %s", self.watermark, failed)
+
+    def should_skip(self, row_num: int, row_id: Optional[str]) -> bool:
+        status = self.statuses.get(row_id) if row_id else None
+
+        if status is not None:
+            skip = status[1] == self.DONE
+        else:
+            skip = row_num <= self.watermark and row_num not in self.failed_rows
+
+        if skip:
+            self._finish(row_num)
+
+        return skip
+
+    def record(self, result: Dict[str, Any]) -> None:
+        row_num = result["row"]
+        row_id = result.get("row_id")
+
+        if row_id:
+            self.statuses[row_id] = (row_num, self.DONE if result["ok"] else self.FAILED)
+        elif result["ok"]:
+            self.failed_rows.discard(row_num)
+        else:
+            self.failed_rows.add(row_num)
+
+        self._finish(row_num)
+
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.save()
+
+    def _finish(self, row_num: int) -> None:
+        self._finished.add(row_num)
+
+        while self.watermark + 1 in self._finished:
+            self.watermark += 1
+            self._finished.remove(self.watermark)
+
+    def save(self) -> None:
+        """
+        Убирает успешные строки до watermark и атомарно перезаписывает файл контрольной точки.
+        """
+        self.statuses = {row_id: (row_num, status) for row_id, (row_num, status) in self.statuses.items()
+                         if status == self.FAILED or row_num > self.watermark}
+
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump({"source": self.source, "watermark": self.watermark, "rows": self.statuses,
+                       "failed_rows": sorted(self.failed_rows)}, f, ensure_ascii=False)
+
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+
+
+class ImportSummary:
+    """
+    Итоги импорта, считаются по мере обработки строк без хранения результатов каждой строки.
+    Если задана контрольная точка, результат каждой строки записывается и в нее.
+    """
+
+    def __init__(self, max_examples: int = 5, checkpoint: Optional[ImportCheckpoint] = None) -> None:
+        self.max_examples = max_examples
+        self.checkpoint = checkpoint
+        self.total = 0
+        self.success = 0
+        self.failed = 0
+        self.skipped = 0
+        self.fail_examples: List[Dict[str, Any]] = []
+
+    def add(self, result: Dict[str, Any]) -> None:
+        self.total += 1
+
+        if self.checkpoint is not None:
+            self.checkpoint.record(result)
+
+        if result["ok"]:
+            self.success += 1
+            return
+
+        self.failed += 1
+        if len(self.fail_examples) < self.max_examples:
+            self.fail_examples.append(result)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_rows": self.total,
+            "success": self.success,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "fail_examples": self.fail_examples,
+        }
+
 
 class EventsCsvImporter:
     EVENTS_CREATE = "/events/create"
@@ -23,24 +166,32 @@ class EventsCsvImporter:
             category_column: Optional[str] = None,
             create_missing_categories: bool = True,
             concurrency: int = 5,
+            queue_size: int = 100,
             timeout: float = 20.0,
             retries: int = 3,
             backoff_base: float = 0.6,
             verify_ssl: bool = True,
             headers: Optional[Dict[str, str]] = None,
             dry_run: bool = False,
+            direct: bool = False,
+            batch_size: int = 2000,
             logger: Optional[logging.Logger] = None,
     ) -> None:
         self.base_url = base_url.rstrip("/")
         self.category_column = category_column
         self.create_missing_categories = create_missing_categories
         self.concurrency = max(1, concurrency)
+        # Сколько прочитанных строк может ждать воркеров, память не растет с размером файла
+        self.queue_size = max(1, queue_size)
         self.timeout = timeout
         self.retries = max(0, retries)
         self.backoff_base = max(0.05, backoff_base)
         self.verify_ssl = verify_ssl
         self.headers = headers or {"Accept": "application/json", "Content-Type": "application/json"}
         self.dry_run = dry_run
+        # direct: запись напрямую в Postgres через движок api.database пачками по batch_size строк
+        self.direct = direct
+        self.batch_size = max(1, batch_size)
 
         self._client: Optional[httpx.AsyncClient] = None
         self._sem = asyncio.Semaphore(self.concurrency)
@@ -50,6 +201,9 @@ class EventsCsvImporter:
         self.log = logger or logging.getLogger(self.__class__.__name__)
 
     async def __aenter__(self) -> "EventsCsvImporter":
+        if self.direct:
+            return self
+
         self._client = httpx.AsyncClient(
             base_url=self.base_url,
             timeout=self.timeout,
@@ -74,9 +228,14 @@ class EventsCsvImporter:
             delimiter: Optional[str] = None,
             limit: Optional[int] = None,
             row_id_field: str = "uuid",
+            checkpoint_path: Optional[Union[str, Path]] = None,
     ) -> Dict[str, Any]:
         """
-        Импортирует CSV построчно. Возвращает сводку.
+        Импортирует CSV построчно: читатель кладет строки в ограниченную очередь,
+        concurrency воркеров отправляют их в API. Возвращает сводку.
+
+        Если задан checkpoint_path, прогресс сохраняется в этот файл и повторный запуск
+        пропускает уже импортированные строки (см. ImportCheckpoint).
         """
         path = Path(file_path)
         if not path.exists():
@@ -90,27 +249,31 @@ class EventsCsvImporter:
                 self.log.info("Определен разделитель CSV: %r", delimiter)
 
             reader = csv.DictReader(f, delimiter=delimiter)
-            total = 0
-            tasks = []
-            for row in reader:
-                if limit is not None and total >= limit:
-                    break
-                total += 1
-                tasks.append(self._process_row(row, row_num=total, row_id=row.get(row_id_field)))
-
-        results = await self._gather_limited(tasks)
-        success = [r for r in results if r["ok"]]
-        failed = [r for r in results if not r["ok"]]
-
-        summary = {
-            "total_rows": len(results),
-            "success": len(success),
-            "failed": len(failed),
-            "fail_examples": failed[:5],
-        }
+            rows = enumerate(reader, start=1)
+            if limit is not None:
+                rows = itertools.islice(rows, limit)
+
+            checkpoint = None
+            if checkpoint_path and not self.dry_run:
+                checkpoint = ImportCheckpoint(checkpoint_path, source=path.resolve())
+                checkpoint.load(self.log)
+
+            summary = ImportSummary(checkpoint=checkpoint)
 
-        self.log.info("Импорт завершен: %s", summary)
-        return summary
+            if checkpoint is not None:
+                rows = self._skip_finished(rows, checkpoint, summary, row_id_field=row_id_field)
+
+            try:
+                if self.direct:
+                    await self._import_direct(rows, summary, row_id_field=row_id_field)
+                else:
+                    await self._import_pipeline(rows, summary, row_id_field=row_id_field)
+            finally:
+                if checkpoint is not None:
+                    checkpoint.save()
+
+        self.log.info("Импорт завершен: %s", summary.as_dict())
+        return summary.as_dict()
 
     # --------------------------
     # Внутренние методы
@@ -125,7 +288,8 @@ class EventsCsvImporter:
 
         try:
             payload = await self._build_payload(row)
-            self._scrub_empty_strings(payload)
+            # Естественный ключ строки: сервер обновляет событие с тем же uuid вместо создания дубля
+            payload["uuid"] = self._clean_str(row_id)
 
             if self.dry_run:
                 self.log.info("%s DRY-RUN payload: %s", row_tag, payload)
@@ -139,9 +303,226 @@ class EventsCsvImporter:
             self.log.error("%s Ошибка: %s", row_tag, e)
             return {"ok": False, "row": row_num, "row_id": row_id, "error": str(e)}
 
-    async def _build_payload(self, row: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def _skip_finished(
+            rows: Iterable[Tuple[int, Dict[str, Any]]],
+            checkpoint: ImportCheckpoint,
+            summary: ImportSummary,
+            *,
+            row_id_field: str,
+    ) -> Iterable[Tuple[int, Dict[str, Any]]]:
+        for row_num, row in rows:
+            if checkpoint.should_skip(row_num, row.get(row_id_field)):
+                summary.skipped += 1
+                continue
+
+            yield row_num, row
+
+    async def _import_pipeline(
+            self,
+            rows: Iterable[Tuple[int, Dict[str, Any]]],
+            summary: ImportSummary,
+            *,
+            row_id_field: str,
+    ) -> None:
         """
-        Преобразует строку CSV в JSON для EventCreateScheme.
+        Читатель -> asyncio.Queue(maxsize=queue_size) -> concurrency воркеров.
+        Когда очередь заполнена, чтение файла ждет воркеров. Если любая из задач падает,
+        остальные отменяются и ошибка пробрасывается, чтобы читатель не ждал вечно места в очереди.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        async def worker() -> None:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+
+                row_num, row = item
+                summary.add(await self._process_row(row, row_num=row_num, row_id=row.get(row_id_field)))
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+
+        async def reader() -> None:
+            for item in rows:
+                await queue.put(item)
+
+            for _ in workers:
+                await queue.put(None)
+
+        tasks = [asyncio.create_task(reader()), *workers]
+
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            errors = [task.exception() for task in done if task.exception() is not None]
+
+            if errors:
+                raise errors[0]
+
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _import_direct(
+            self,
+            rows: Iterable[Tuple[int, Dict[str, Any]]],
+            summary: ImportSummary,
+            *,
+            row_id_field: str,
+    ) -> None:
+        """
+        Прямая загрузка в БД: строки читаются пачками по batch_size, на пачку - один запрос категорий
+        и один многострочный INSERT ... RETURNING.
+        """
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+
+        for item in rows:
+            batch.append(item)
+
+            if len(batch) >= self.batch_size:
+                for result in await self._insert_batch(batch, row_id_field=row_id_field):
+                    summary.add(result)
+                batch = []
+
+        if batch:
+            for result in await self._insert_batch(batch, row_id_field=row_id_field):
+                summary.add(result)
+
+    async def _insert_batch(
+            self,
+            batch: List[Tuple[int, Dict[str, Any]]],
+            *,
+            row_id_field: str,
+    ) -> List[Dict[str, Any]]:
+        """
+        Валидирует пачку строк через EventCreateScheme и вставляет ее одной транзакцией.
+        Строки без категории отклоняются до вставки (category_id в events обязателен). Если вставка
+        все же не удалась, пачка делится пополам до строк с ошибкой, остальные строки записываются.
+        """
+        from pydantic import ValidationError
+
+        from api.database import async_session_maker
+        from api.schemas.event_schemes import EventCreateScheme
+        from api.services.daos.event_daos import EventCategoryDAO, EventDAO
+
+        results: List[Dict[str, Any]] = []
+        valid: List[Tuple[int, Optional[str], Dict[str, Any]]] = []
+
+        async with async_session_maker() as session:
+            if self.category_column and not self.dry_run:
+                await self._resolve_categories(EventCategoryDAO(session=session), [row for _, row in batch])
+
+            for row_num, row in batch:
+                row_id = row.get(row_id_field)
+                payload = self._row_payload(row)
+                payload["uuid"] = self._clean_str(row_id)
+
+                category_name = self._category_name(row)
+                if category_name and category_name in self._category_cache:
+                    payload["category_id"] = self._category_cache[category_name]
+
+                try:
+                    event_data = EventCreateScheme(**payload).dict()
+                except ValidationError as e:
+                    self.log.error("row#%s Ошибка валидации: %s", row_num, e)
+                    results.append({"ok": False, "row": row_num, "row_id": row_id, "error": str(e)})
+                    continue
+
+                if event_data.get("category_id") is None:
+                    error = f"Не найдена категория события: {category_name!r}"
+                    self.log.error("row#%s %s", row_num, error)
+                    results.append({"ok": False, "row": row_num, "row_id": row_id, "error": error})
+                    continue
+
+                valid.append((row_num, row_id, event_data))
+
+            if self.dry_run:
+                self.log.info("DRY-RUN: пачка строк %s-%s, к вставке %s", batch[0][0], batch[-1][0], len(valid))
+                return results + [{"ok": True, "row": row_num, "row_id": row_id, "event_id": None, "dry_run": True}
+                                  for row_num, row_id, _ in valid]
+
+            # ON CONFLICT DO UPDATE не может дважды обновить одну строку в одном запросе,
+            # поэтому повторы uuid внутри пачки схлопываются, побеждает последняя строка
+            unique_data: List[Dict[str, Any]] = []
+            positions: Dict[str, int] = {}
+            row_positions: List[int] = []
+
+            for _, _, data in valid:
+                uuid = data.get("uuid")
+                position = positions.get(uuid) if uuid else None
+
+                if position is None:
+                    position = len(unique_data)
+                    unique_data.append(data)
+                    if uuid:
+                        positions[uuid] = position
+                else:
+                    unique_data[position] = data
+
+                row_positions.append(position)
+
+            outcomes = await self._insert_bisect(session, EventDAO(session=session), unique_data)
+
+        for (row_num, row_id, _), position in zip(valid, row_positions):
+            outcome = outcomes[position]
+
+            if isinstance(outcome, Exception):
+                self.log.error("row#%s Ошибка вставки: %s", row_num, outcome)
+                results.append({"ok": False, "row": row_num, "row_id": row_id, "error": str(outcome)})
+            else:
+                results.append({"ok": True, "row": row_num, "row_id": row_id, "event_id": outcome})
+
+        self.log.info("Записано %s событий (строки %s-%s)",
+                      sum(not isinstance(outcome, Exception) for outcome in outcomes), batch[0][0], batch[-1][0])
+
+        return results
+
+    async def _insert_bisect(self, session, event_dao, data: List[Dict[str, Any]]) -> List[Union[int, Exception]]:
+        """
+        Вставляет data одним запросом. При ошибке откатывает транзакцию и делит пачку пополам,
+        пока ошибка не останется на отдельных строках. Возвращает id события или ошибку для каждого элемента.
+        """
+        try:
+            return await event_dao.create_many(data=data)
+        except Exception as e:
+            await session.rollback()
+
+            if len(data) == 1:
+                return [e]
+
+            self.log.warning("Ошибка вставки пачки из %s событий, пачка делится: %s", len(data), e)
+
+        middle = len(data) // 2
+
+        return (await self._insert_bisect(session, event_dao, data[:middle])
+                + await self._insert_bisect(session, event_dao, data[middle:]))
+
+    async def _resolve_categories(self, category_dao, rows: List[Dict[str, Any]]) -> None:
+        """
+        Получает id всех новых для импорта категорий пачки одним запросом (и создает недостающие).
+        """
+        names = list(dict.fromkeys(
+            name for name in map(self._category_name, rows)
+            if name and name not in self._category_cache
+        ))
+
+        if not names:
+            return
+
+        categories = await category_dao.get_or_create_many(names=names,
+                                                           create_missing=self.create_missing_categories)
+        self._category_cache.update(categories)
+
+        for name in names:
+            if name not in categories:
+                self.log.warning("Не удалось получить/создать категорию '%s'", name)
+
+    def _category_name(self, row: Dict[str, Any]) -> Optional[str]:
+        return self._clean_str(row.get(self.category_column)) if self.category_column else None
+
+    def _row_payload(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Поля события из строки CSV без категории, пустые строки заменены на None.
         """
         payload: Dict[str, Any] = {
             "address": self._clean_str(row.get("address")),
@@ -152,10 +533,19 @@ class EventsCsvImporter:
             "end_datetime": self._to_iso_or_none(row.get("end_date")),
             "geom": self._parse_wkt_to_latlon_list(row.get("geom")),
         }
+        self._scrub_empty_strings(payload)
+
+        return payload
+
+    async def _build_payload(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Преобразует строку CSV в JSON для EventCreateScheme.
+        """
+        payload = self._row_payload(row)
 
         # Категория (опционально)
         if self.category_column:
-            category_name = self._clean_str(row.get(self.category_column))
+            category_name = self._category_name(row)
             if category_name:
                 category_id = await self._get_or_create_category(category_name)
                 if category_id is not None:
@@ -337,7 +727,8 @@ class EventsCsvImporter:
     @staticmethod
     def _parse_wkt_to_latlon_list(wkt: Any) -> Optional[List[Dict[str, float]]]:
         """
-        Преобразует WKT в список [{'lat': float, 'lon': float}, ...].
+        Преобразует WKT в список [{'lat': float, 'lon': float}, ...] (все точки всех колец подряд,
+        в формате поля Event.geom). Кольца с границами доступны через api.utils.wkt_parser.parse_wkt.
         """
         if not wkt:
             return None
@@ -345,20 +736,9 @@ class EventsCsvImporter:
         if s == "":
             return None
 
-        points: List[Dict[str, float]] = []
-
         try:
-            coord_pattern = r"[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?"
-            coord_pairs = re.findall(rf"({coord_pattern}\s+{coord_pattern})", s)
-
-            for pair in coord_pairs:
-                coords = re.findall(coord_pattern, pair)
-                if len(coords) >= 2:
-                    lon = float(coords[0])
-                    lat = float(coords[1])
-                    points.append({"lat": lat, "lon": lon})
-
-        except Exception as e:
+            points = parse_wkt(s).to_latlon_list()
+        except ValueError as e:
             logging.debug("Ошибка парсинга WKT %r: %s", wkt, e)
             return None
 
@@ -373,20 +753,6 @@ class EventsCsvImporter:
             if isinstance(v, str) and v.strip() == "":
                 payload[k] = None
 
-    async def _gather_limited(self, coroutines: List[asyncio.Future]) -> List[Any]:
-        """
-        Аккуратно ждет выполнения набора задач.
-        """
-        results: List[Any] = []
-        for coro in asyncio.as_completed(coroutines):
-            try:
-                res = await coro
-            except Exception as e:
-                results.append({"ok": False, "error": str(e)})
-            else:
-                results.append(res)
-        return results
-
 
 # Синхронная обертка
 def import_events_from_csv(
@@ -396,16 +762,20 @@ def import_events_from_csv(
         category_column: Optional[str] = None,
         create_missing_categories: bool = True,
         concurrency: int = 5,
+        queue_size: int = 100,
         timeout: float = 20.0,
         retries: int = 3,
         backoff_base: float = 0.6,
         verify_ssl: bool = True,
         headers: Optional[Dict[str, str]] = None,
         dry_run: bool = False,
+        direct: bool = False,
+        batch_size: int = 2000,
         encoding: str = "utf-8-sig",
         delimiter: Optional[str] = None,
         limit: Optional[int] = None,
         row_id_field: str = "uuid",
+        checkpoint_path: Optional[Union[str, Path]] = None,
 ) -> Dict[str, Any]:
     """
     Синхронная обертка для импорта событий из CSV.
@@ -417,15 +787,19 @@ def import_events_from_csv(
                 category_column=category_column,
                 create_missing_categories=create_missing_categories,
                 concurrency=concurrency,
+                queue_size=queue_size,
                 timeout=timeout,
                 retries=retries,
                 backoff_base=backoff_base,
                 verify_ssl=verify_ssl,
                 headers=headers,
                 dry_run=dry_run,
+                direct=direct,
+                batch_size=batch_size,
         ) as importer:
             return await importer.import_csv(
-                path, encoding=encoding, delimiter=delimiter, limit=limit, row_id_field=row_id_field
+                path, encoding=encoding, delimiter=delimiter, limit=limit, row_id_field=row_id_field,
+                checkpoint_path=checkpoint_path,
             )
 
     return asyncio.run(_run())
@@ -437,14 +811,25 @@ if __name__ == "__main__":
         format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
     )
 
+    arg_parser = argparse.ArgumentParser(description="Импорт событий из CSV")
+    arg_parser.add_argument("--csv", default="data/events.csv", help="CSV файл с событиями")
+    arg_parser.add_argument("--direct", action="store_true",
+                            help="Писать напрямую в Postgres пачками вместо запросов к API")
+    arg_parser.add_argument("--batch-size", type=int, default=2000, help="Размер пачки для --direct")
+    arg_parser.add_argument("--limit", type=int, default=500, help="Сколько строк импортировать (0 - все)")
+    arg_parser.add_argument("--checkpoint", default=None,
+                            help="Файл контрольной точки (по умолчанию <csv>.checkpoint.json, пустая строка - без нее)")
+    args = arg_parser.parse_args()
+
     print("=== DRY RUN ===")
     summary = import_events_from_csv(
-        "data/events.csv",
+        args.csv,
         base_url="https://2gis-bratskiy.ru",
         category_column="event_type_name",
         create_missing_categories=True,
         concurrency=2,
         dry_run=True,  # Только просмотр payload
+        direct=args.direct,
         encoding="utf-8-sig",
         limit=3,  # Только первые 3 строки для теста
         row_id_field="uuid"
@@ -458,15 +843,18 @@ if __name__ == "__main__":
         if response.lower() in ['y', 'yes', 'да']:
             print("\n=== REAL IMPORT ===")
             summary = import_events_from_csv(
-                "data/events.csv",
+                args.csv,
                 base_url="https://2gis-bratskiy.ru",
                 category_column="event_type_name",
                 create_missing_categories=True,
                 concurrency=2,
                 dry_run=False,  # Реальный импорт
+                direct=args.direct,
+                batch_size=args.batch_size,
                 encoding="utf-8-sig",
-                limit=500,
-                row_id_field="uuid"
+                limit=args.limit or None,
+                row_id_field="uuid",
+                checkpoint_path=f"{args.csv}.checkpoint.json" if args.checkpoint is None else args.checkpoint,
             )
             print("Real import summary:", summary)
         else:
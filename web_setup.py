@@ -11,6 +11,10 @@ from starlette.middleware.cors import CORSMiddleware
 
 from api.database import engine
 from api.routers.global_router import router
+from api.services.external.weather_prefetcher import weather_prefetcher
+from api.services.internal.blind_service import description_cache, description_jobs
+from api.services.internal.noise_store import noise_store
+from api.utils.http_clients import close_http_clients
 from admin.admin_global import AdminAuth, admin_models
 
 
@@ -49,3 +53,17 @@ if is_prod:
 async def on_startup_():
     for model in admin_models:
         admin.add_view(model)
+
+    noise_store.load()
+    description_jobs.start()
+
+    if config_parameters.WEATHER_PREFETCH_ENABLED:
+        weather_prefetcher.start()
+
+
+@server.on_event('shutdown')
+async def on_shutdown_():
+    await weather_prefetcher.stop()
+    await description_jobs.stop()
+    description_cache.save()
+    await close_http_clients()